@@ -1,6 +1,10 @@
 import streamlit as st
 
-from data_loader import DATA_PATH, get_dataset
+from data_loader import DATA_PATH, get_dataset, memory_report
+from instrumentation import debug_panel
+from lazy_imports import mark_first_paint, startup_profile, wait_until_warm, warm_in_background
+from process_memory import current_rss, get_session_registry, rss_by_sessions
+from waves import wave_summary, waves_dir
 
 st.set_page_config(page_title="IMP Dashboard", layout="wide")
 
@@ -18,6 +22,48 @@ if st.session_state.get("_dataset_loaded") is None:
 
 st.dataframe(df.head())
 
+with st.expander("Memory layout"):
+    report = memory_report(df)
+    before, after = report["before_bytes"].sum(), report["after_bytes"].sum()
+    st.caption(
+        f"{before / 1024:,.0f} KiB → {after / 1024:,.0f} KiB "
+        f"({after / max(len(df), 1):,.0f} bytes per respondent)"
+    )
+    st.dataframe(report)
+
+    rss = current_rss()
+    sessions = get_session_registry().active
+    st.caption(
+        f"Process RSS {rss / 2 ** 20:,.0f} MiB with {sessions} active session(s); "
+        "all sessions share one read-only copy of the dataset."
+        if rss is not None
+        else f"{sessions} active session(s) share one read-only copy of the dataset."
+    )
+    by_sessions = rss_by_sessions()
+    if len(by_sessions) > 1:
+        st.line_chart(by_sessions, x="sessions", y="rss_mib", x_label="Active sessions", y_label="Peak RSS (MiB)")
+
+waves_directory = waves_dir()
+if waves_directory is not None:
+    with st.expander("Survey waves"):
+        st.caption("Mean (SD) of each scale from the running statistics kept per wave; adding a wave processes only its own rows.")
+        st.dataframe(wave_summary(waves_directory), hide_index=True)
+
+# The landing page needs none of the plotting/statistics stack, so it paints
+# first and those modules are imported on a background thread meanwhile.
+mark_first_paint()
+warm_in_background()
+
+with st.expander("Startup profile"):
+    first_paint, imports = startup_profile()
+    if first_paint is not None:
+        st.caption(f"First paint {first_paint:.2f}s after the server process started.")
+    if not wait_until_warm(timeout=0):
+        st.caption("Plotting and statistics modules are still loading in the background.")
+    st.dataframe(imports.round(3), hide_index=True)
+
+debug_panel()
+
 if not st.session_state.get("_navigated_overview") and hasattr(st, "switch_page"):
     st.session_state["_navigated_overview"] = True
     st.switch_page("pages/1_Overview.py")
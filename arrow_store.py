@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    _PYARROW_AVAILABLE = True
+except ImportError:
+    _PYARROW_AVAILABLE = False
+
+# Directory holding the processed dataset as memory-mapped Arrow IPC files
+# shared by every worker process on the host; the mode is off when unset.
+ARROW_DIR_ENV = "IMP_DASHBOARD_ARROW_DIR"
+POINTER_NAME = "CURRENT"
+# Superseded versions kept so sessions still mapping them are unaffected on
+# platforms that refuse to delete mapped files.
+KEEP_VERSIONS = 2
+
+# Field metadata marking columns written in a layout that maps back without
+# a copy: nullable int8 as plain int8 (plus a uint8 mask column when any
+# value is missing) and categoricals as their integer codes.
+_KIND_KEY = b"imp_dashboard.kind"
+_MASK_KEY = b"imp_dashboard.mask"
+_CATEGORIES_KEY = b"imp_dashboard.categories"
+_ORDERED_KEY = b"imp_dashboard.ordered"
+
+
+def arrow_dir() -> Optional[Path]:
+    if not _PYARROW_AVAILABLE:
+        return None
+    value = os.environ.get(ARROW_DIR_ENV)
+    return Path(value) if value else None
+
+
+def version_file(directory: Path, stem: str, fingerprint: str) -> Path:
+    return directory / f"{stem}.{fingerprint}.arrow"
+
+
+def current_version(directory: Path) -> Optional[Path]:
+    """The published Arrow file the pointer names, if it exists."""
+    try:
+        name = (directory / POINTER_NAME).read_text().strip()
+    except OSError:
+        return None
+    path = directory / name
+    return path if name and path.exists() else None
+
+
+def fingerprint_of(version: Path, stem: str) -> str:
+    return version.name[len(stem) + 1:-len(".arrow")]
+
+
+def _to_table(df: pd.DataFrame) -> "pa.Table":
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    masks = []
+    for i, name in enumerate(table.column_names):
+        values = df[name]
+        if values.dtype.kind == "f":
+            # NaN stays NaN instead of becoming a null, so the column maps
+            # straight into a float ndarray without a fill copy.
+            table = table.set_column(i, table.schema.field(i), pa.array(values.to_numpy(), from_pandas=False))
+        elif isinstance(values.dtype, pd.Int8Dtype):
+            metadata = {_KIND_KEY: b"Int8"}
+            missing = values.isna().to_numpy()
+            if missing.any():
+                mask_name = f"{name}.__mask__"
+                metadata[_MASK_KEY] = mask_name.encode()
+                masks.append((mask_name, pa.array(missing.view(np.uint8))))
+            data = pa.array(values.to_numpy(dtype=np.int8, na_value=0))
+            table = table.set_column(i, pa.field(name, pa.int8(), metadata=metadata), data)
+        elif isinstance(values.dtype, pd.CategoricalDtype) and all(
+            isinstance(category, str) for category in values.cat.categories
+        ):
+            metadata = {
+                _KIND_KEY: b"category",
+                _CATEGORIES_KEY: json.dumps(list(values.cat.categories)).encode(),
+                _ORDERED_KEY: b"1" if values.cat.ordered else b"0",
+            }
+            codes = values.cat.codes.to_numpy()
+            field = pa.field(name, pa.from_numpy_dtype(codes.dtype), metadata=metadata)
+            table = table.set_column(i, field, pa.array(codes))
+    for mask_name, mask in masks:
+        table = table.append_column(mask_name, mask)
+    return table
+
+
+def publish(df: pd.DataFrame, directory: Path, stem: str, fingerprint: str) -> Path:
+    """Write ``df`` as a new version and swap the pointer to it atomically.
+
+    Readers see either the previous version or the complete new one, never a
+    partially written file.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    target = version_file(directory, stem, fingerprint)
+    if not target.exists():
+        table = _to_table(df)
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        try:
+            with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp, target)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    pointer_tmp = directory / f"{POINTER_NAME}.{os.getpid()}.tmp"
+    pointer_tmp.write_text(target.name)
+    os.replace(pointer_tmp, directory / POINTER_NAME)
+    _prune(directory, stem, keep=target)
+    return target
+
+
+def _prune(directory: Path, stem: str, keep: Path) -> None:
+    versions = sorted(
+        (p for p in directory.glob(f"{stem}.*.arrow") if p != keep),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    for stale in versions[KEEP_VERSIONS - 1:]:
+        try:
+            stale.unlink()
+        except OSError:
+            # Still mapped by a worker on a platform that forbids deleting it.
+            pass
+
+
+def _view(column: "pa.ChunkedArray") -> np.ndarray:
+    # Read-only ndarray over the mapped buffer (one chunk, no nulls).
+    array = column.combine_chunks() if column.num_chunks != 1 else column.chunk(0)
+    return array.to_numpy(zero_copy_only=False)
+
+
+def map_version(version: Path) -> pd.DataFrame:
+    """Load a published version as a DataFrame backed by a read-only memory map.
+
+    Float, nullable int8 and string-categorical columns are views of the
+    mapping, so every process shares the page cache's single physical copy
+    of them. Other columns (integers wider than int8, strings, categoricals
+    of non-strings) are converted, a private copy of their size per process.
+    """
+    source = pa.memory_map(str(version), "r")
+    table = pa.ipc.open_file(source).read_all()
+    schema = table.schema
+    masks = {field.metadata[_MASK_KEY].decode() for field in schema if _MASK_KEY in (field.metadata or {})}
+    plain = [f.name for f in schema if _KIND_KEY not in (f.metadata or {}) and f.name not in masks]
+    # split_blocks keeps one block per column so pandas does not consolidate
+    # (and therefore copy) the mapped float columns.
+    converted = table.select(plain).to_pandas(split_blocks=True)
+
+    no_missing = np.zeros(table.num_rows, dtype=bool)
+    no_missing.flags.writeable = False
+    columns: Dict[str, object] = {}
+    for field in schema:
+        metadata = field.metadata or {}
+        kind = metadata.get(_KIND_KEY)
+        if field.name in masks:
+            continue
+        if kind is None:
+            columns[field.name] = converted[field.name].array
+        elif kind == b"Int8":
+            mask_name = metadata.get(_MASK_KEY)
+            mask = _view(table.column(mask_name.decode())).view(bool) if mask_name else no_missing
+            columns[field.name] = pd.arrays.IntegerArray(_view(table.column(field.name)), mask)
+        else:
+            dtype = pd.CategoricalDtype(json.loads(metadata[_CATEGORIES_KEY]), ordered=metadata[_ORDERED_KEY] == b"1")
+            codes = _view(table.column(field.name))
+            columns[field.name] = pd.Categorical.from_codes(codes, dtype=dtype, validate=False)
+    return pd.DataFrame(columns, copy=False)
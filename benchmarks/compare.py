@@ -0,0 +1,63 @@
+"""Compare two benchmark reports and fail on timing or memory regressions.
+
+    python -m benchmarks.compare base.json candidate.json --threshold 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import sys
+from typing import Dict
+
+# Relative slowdown tolerated before a metric counts as regressed.
+DEFAULT_THRESHOLD = 0.2
+# Timing differences below this are noise at any ratio.
+MIN_DELTA_S = 0.05
+MIN_DELTA_BYTES = 16 * 2 ** 20
+
+
+def flatten(report: dict) -> Dict[str, float]:
+    """``{"<rows>/<page>/<metric>": value}`` for every comparable number in a report."""
+    metrics: Dict[str, float] = {}
+    for rows, scale in report["scales"].items():
+        metrics[f"{rows}/ingest_s"] = scale["ingest"]["seconds"]
+        if scale.get("peak_rss_bytes") is not None:
+            metrics[f"{rows}/peak_rss_bytes"] = scale["peak_rss_bytes"]
+        for page, result in scale["pages"].items():
+            metrics[f"{rows}/{page}/cold_s"] = result["cold_s"]
+            metrics[f"{rows}/{page}/warm_s"] = result["warm_s"]
+            for widget, seconds in result["widgets"].items():
+                metrics[f"{rows}/{page}/{widget}"] = seconds
+    return metrics
+
+
+def regressions(base: dict, candidate: dict, threshold: float = DEFAULT_THRESHOLD) -> list[tuple[str, float, float]]:
+    before, after = flatten(base), flatten(candidate)
+    found = []
+    for name in sorted(before.keys() & after.keys()):
+        old, new = before[name], after[name]
+        floor = MIN_DELTA_BYTES if name.endswith("_bytes") else MIN_DELTA_S
+        if new - old > floor and new > old * (1 + threshold):
+            found.append((name, old, new))
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    base = json.loads(args.base.read_text())
+    candidate = json.loads(args.candidate.read_text())
+    found = regressions(base, candidate, args.threshold)
+    for name, old, new in found:
+        print(f"REGRESSION {name}: {old:,.3f} -> {new:,.3f} ({new / old - 1:+.0%})" if old else f"REGRESSION {name}: {old} -> {new}")
+    print(f"{len(found)} regression(s) over {args.threshold:.0%} between {base.get('revision')} and {candidate.get('revision')}")
+    sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
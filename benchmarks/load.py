@@ -0,0 +1,242 @@
+"""Concurrent-session load test: rerun latency percentiles, throughput and RSS as sessions grow.
+
+    python -m benchmarks.load --sessions 1 4 16 32 --rounds 3 --output benchmarks/results/load.json
+
+Each simulated analyst is an AppTest session in its own Python process
+(AppTest is not thread-safe, so sessions cannot share one interpreter). It
+opens the app, then visits the four pages in its own random order. On every
+page it changes a random selectbox (predictor, moderator, split, ...) a few
+times. Sessions contend for CPU and memory as concurrent analysts on one
+host do, but each fills its own in-memory caches, so the first visit to
+each page is cold; the warm-up only builds the on-disk dataset cache.
+Memory is the summed RSS of all session processes.
+
+Every rerun a session plans must complete: a rerun that raises, shows an
+exception, renders nothing or never happens (the session process died)
+counts as an error, as does any exception logged by Streamlit or raised on
+a thread of the session process.
+Set IMP_DASHBOARD_DATA to load-test a synthetic dataset (see benchmarks.synthetic).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+from pathlib import Path
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+PAGES = [
+    "pages/1_Overview.py",
+    "pages/2_Burnout_Summary.py",
+    "pages/3_Exploratory_Insights.py",
+    "pages/4_Moderation_Graphs.py",
+]
+DEFAULT_SESSIONS = [1, 2, 4, 8, 16]
+SESSION_TIMEOUT_S = 900
+RSS_SAMPLE_INTERVAL_S = 0.25
+
+
+class RssSampler:
+    """Samples the summed RSS of ``pids`` on a background thread until stopped."""
+
+    def __init__(self, pids: list[int]) -> None:
+        self.pids = pids
+        self.samples: list[int] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self) -> None:
+        from process_memory import current_rss
+
+        while not self._stop.is_set():
+            sizes = [rss for rss in map(current_rss, self.pids) if rss is not None]
+            if sizes:
+                self.samples.append(sum(sizes))
+            self._stop.wait(RSS_SAMPLE_INTERVAL_S)
+
+    def __enter__(self) -> "RssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+class _ErrorLog(logging.Handler):
+    """Collects ERROR records from Streamlit's loggers, which do not propagate to the root."""
+
+    def __init__(self, errors: list) -> None:
+        super().__init__(logging.ERROR)
+        self.errors = errors
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.errors.append(f"{record.name}: {record.getMessage()}")
+
+    def attach(self) -> None:
+        # Streamlit creates its loggers as modules import; pick up new ones.
+        for name, logger in list(logging.root.manager.loggerDict.items()):
+            if name.startswith("streamlit") and isinstance(logger, logging.Logger) and self not in logger.handlers:
+                logger.addHandler(self)
+
+
+def planned_reruns(rounds: int, changes: int) -> int:
+    """Reruns one session attempts: the app, then every page visit and widget change."""
+    return 1 + rounds * len(PAGES) * (1 + changes)
+
+
+def run_session(seed: int, rounds: int, changes: int, think_s: float) -> dict:
+    """One analyst in this process; returns its rerun latencies and errors."""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    latencies: list[tuple[str, float]] = []
+    errors: list[str] = []
+    skipped = failed = 0
+    error_log = _ErrorLog(errors)
+    threading.excepthook = lambda hook: errors.append(f"thread {hook.thread.name}: {hook.exc_value!r}")
+
+    def rerun(at, action: str) -> None:
+        nonlocal failed
+        time.sleep(rng.uniform(0, think_s))
+        error_log.attach()
+        start = time.perf_counter()
+        try:
+            at.run()
+        except Exception as exc:  # a timeout or harness failure counts against the session
+            errors.append(f"{action}: {exc!r}")
+            failed += 1
+            return
+        latencies.append((action, time.perf_counter() - start))
+        errors.extend(f"{action}: {e.value}" for e in at.exception)
+        if len(at.main) == 0:
+            errors.append(f"{action}: rerun rendered nothing")
+
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=SESSION_TIMEOUT_S)
+    rerun(at, "app.py")
+    for _ in range(rounds):
+        for page in rng.sample(PAGES, len(PAGES)):
+            at.switch_page(page)
+            rerun(at, page)
+            for i in range(changes):
+                if not at.selectbox:
+                    skipped += changes - i
+                    break
+                box = at.selectbox[rng.randrange(len(at.selectbox))]
+                box.set_value(rng.choice(box.options))
+                rerun(at, f"{page}:{box.label}")
+    return {"latencies": latencies, "errors": errors, "skipped": skipped, "failed": failed}
+
+
+def run_level(sessions: int, rounds: int, changes: int, think_s: float, seed: int) -> dict:
+    """Run ``sessions`` concurrent analysts, one process each, to completion and summarise their reruns."""
+    latencies: list[tuple[str, float]] = []
+    errors: list[str] = []
+    missing = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        outputs = [Path(tmp) / f"session-{i}.json" for i in range(sessions)]
+        logs = [Path(tmp) / f"session-{i}.log" for i in range(sessions)]
+        start = time.perf_counter()
+        procs = []
+        for i, (out, log) in enumerate(zip(outputs, logs)):
+            with open(log, "w") as stderr:
+                # Results come back through a file: Streamlit logs to stdout.
+                procs.append(subprocess.Popen(
+                    [
+                        sys.executable, "-m", "benchmarks.load", "--worker", str(seed + i),
+                        "--rounds", str(rounds), "--changes", str(changes), "--think", str(think_s),
+                        "--output", str(out),
+                    ],
+                    cwd=ROOT,
+                    stdout=subprocess.DEVNULL,
+                    stderr=stderr,
+                ))
+        with RssSampler([proc.pid for proc in procs]) as rss:
+            for proc in procs:
+                proc.wait()
+        wall = time.perf_counter() - start
+
+        for i, (proc, out, log) in enumerate(zip(procs, outputs, logs)):
+            if proc.returncode != 0 or not out.exists():
+                tail = log.read_text(errors="replace").strip().splitlines()[-1:] or ["no output"]
+                errors.append(f"session {i}: exited with code {proc.returncode}: {tail[0]}")
+                missing += planned_reruns(rounds, changes)
+                continue
+            result = json.loads(out.read_text())
+            latencies += [tuple(entry) for entry in result["latencies"]]
+            errors += [f"session {i}: {error}" for error in result["errors"]]
+            attempted = len(result["latencies"]) + result["failed"]
+            missing += max(0, planned_reruns(rounds, changes) - result["skipped"] - attempted)
+
+    seconds = np.array([s for _, s in latencies]) if latencies else np.array([np.nan])
+    p50, p95, p99 = np.percentile(seconds, [50, 95, 99])
+    return {
+        "sessions": sessions,
+        "reruns": len(latencies),
+        "missing_reruns": missing,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 3),
+        "p50_s": round(float(p50), 4),
+        "p95_s": round(float(p95), 4),
+        "p99_s": round(float(p99), 4),
+        "max_s": round(float(np.max(seconds)), 4),
+        "peak_rss_bytes": max(rss.samples, default=None),
+        "mean_rss_bytes": int(np.mean(rss.samples)) if rss.samples else None,
+        "errors": errors[:20],
+        "error_count": len(errors) + missing,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=DEFAULT_SESSIONS)
+    parser.add_argument("--rounds", type=int, default=2, help="passes over the four pages per session")
+    parser.add_argument("--changes", type=int, default=2, help="widget changes per page visit")
+    parser.add_argument("--think", type=float, default=0.5, help="max seconds of think time before each rerun")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-warmup", action="store_true", help="let the first level also build the dataset cache")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT))
+    os.chdir(ROOT)
+
+    if args.worker is not None:
+        result = run_session(args.worker, args.rounds, args.changes, args.think)
+        args.output.write_text(json.dumps(result))
+        return
+
+    if not args.no_warmup:
+        run_level(1, 1, 0, 0.0, args.seed)
+
+    levels: list[dict] = []
+    print(f"{'sessions':>8} {'reruns':>7} {'rps':>7} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'peak RSS MiB':>13} {'errors':>6}")
+    for n in args.sessions:
+        level = run_level(n, args.rounds, args.changes, args.think, args.seed)
+        levels.append(level)
+        rss: Optional[int] = level["peak_rss_bytes"]
+        print(
+            f"{n:>8} {level['reruns']:>7} {level['throughput_rps']:>7.2f} {level['p50_s']:>7.3f} "
+            f"{level['p95_s']:>7.3f} {level['p99_s']:>7.3f} "
+            f"{rss / 2 ** 20 if rss is not None else float('nan'):>13,.0f} {level['error_count']:>6}",
+            flush=True,
+        )
+
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps({"data": os.environ.get("IMP_DASHBOARD_DATA"), "levels": levels}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
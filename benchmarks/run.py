@@ -0,0 +1,181 @@
+"""Headless page-rerun benchmarks over synthetic datasets of increasing size.
+
+    python -m benchmarks.run --rows 1000 100000 1000000 --output benchmarks/results/HEAD.json
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/HEAD.json
+
+Each dataset size runs in its own process so caches start cold and peak RSS
+belongs to that size alone. Within it, the source is first ingested from
+scratch, then every page is run in a fresh session with Streamlit's caches
+cleared (cold), rerun unchanged (warm), and rerun once per selectbox option.
+"""
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timezone
+import json
+import os
+from pathlib import Path
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+PAGES = [
+    "app.py",
+    "pages/1_Overview.py",
+    "pages/2_Burnout_Summary.py",
+    "pages/3_Exploratory_Insights.py",
+    "pages/4_Moderation_Graphs.py",
+]
+DEFAULT_ROWS = [1_000, 100_000, 1_000_000]
+DATA_DIR = ROOT / "benchmarks" / "data"
+PAGE_TIMEOUT_S = 900
+
+
+def _peak_rss() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _stage_totals() -> Dict[str, Dict[str, float]]:
+    import instrumentation
+
+    return {
+        row.stage: {
+            "calls": int(row.calls),
+            "total_s": round(float(row.total_s), 6),
+            "cache_hits": int(row.cache_hits),
+            "cache_misses": int(row.cache_misses),
+        }
+        for row in instrumentation.summary().itertuples()
+    }
+
+
+def _timed_run(at) -> tuple[float, list[str]]:
+    start = time.perf_counter()
+    at.run()
+    seconds = time.perf_counter() - start
+    errors = [str(e.value) for e in at.exception] + [str(e.value) for e in at.error]
+    return round(seconds, 6), errors
+
+
+def _bench_page(page: str) -> dict:
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    import instrumentation
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    instrumentation.reset()
+
+    at = AppTest.from_file(str(ROOT / page), default_timeout=PAGE_TIMEOUT_S)
+    cold, errors = _timed_run(at)
+    result = {"cold_s": cold, "stages": _stage_totals()}
+    warm, more = _timed_run(at)
+    result["warm_s"] = warm
+    errors += more
+
+    widgets: Dict[str, float] = {}
+    for i in range(len(at.selectbox)):
+        for option in at.selectbox[i].options:
+            label = at.selectbox[i].label
+            at.selectbox[i].set_value(option)
+            seconds, more = _timed_run(at)
+            widgets[f"{label}={option}"] = seconds
+            errors += more
+    result["widgets"] = widgets
+    result["errors"] = errors
+    return result
+
+
+def run_worker(source: Path) -> dict:
+    """Benchmark one dataset in this process; ``IMP_DASHBOARD_DATA`` must already name it."""
+    sys.path.insert(0, str(ROOT))
+    os.chdir(ROOT)
+    import data_loader
+    import instrumentation
+
+    instrumentation.reset()
+    data_loader.cache_path(source).unlink(missing_ok=True)
+    start = time.perf_counter()
+    data_loader.load_dataset(source)
+    ingest = {"seconds": round(time.perf_counter() - start, 6), "stages": _stage_totals()}
+
+    pages = {page: _bench_page(page) for page in PAGES}
+    return {"source": str(source), "ingest": ingest, "pages": pages, "peak_rss_bytes": _peak_rss()}
+
+
+def dataset_for(rows: int, seed: int, data_dir: Path = DATA_DIR) -> Path:
+    from benchmarks.synthetic import write_dataset
+
+    path = data_dir / f"survey_{rows}_seed{seed}.csv"
+    if not path.exists():
+        write_dataset(path, rows, seed)
+    return path
+
+
+def _revision() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def run_suite(rows: list[int], seed: int, data_dir: Path) -> dict:
+    report = {
+        "revision": _revision(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scales": {},
+    }
+    for n in rows:
+        source = dataset_for(n, seed, data_dir)
+        env = {
+            **os.environ,
+            "IMP_DASHBOARD_DATA": str(source),
+            "IMP_DASHBOARD_PROFILE": "time",
+            "IMP_DASHBOARD_PROFILE_LOG": os.devnull,
+        }
+        # Results come back through a file: Streamlit logs to stdout.
+        with tempfile.TemporaryDirectory() as tmp:
+            out = Path(tmp) / "scale.json"
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.run", "--worker", str(source), "--output", str(out)],
+                cwd=ROOT,
+                env=env,
+                check=True,
+            )
+            report["scales"][str(n)] = {"rows": n, **json.loads(out.read_text())}
+        print(f"{n:>9,} rows done", file=sys.stderr)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    parser.add_argument("--output", type=Path, required=True)
+    parser.add_argument("--worker", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    report = run_worker(args.worker) if args.worker else run_suite(args.rows, args.seed, args.data_dir)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Synthetic survey sources with the packaged workbook's column layout.
+
+    python -m benchmarks.synthetic --rows 100000 --out benchmarks/data/survey_100k.csv
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Dict, Iterator
+
+import numpy as np
+import pandas as pd
+
+# prefix -> (items, lowest response, highest response), as in the packaged workbook
+ITEM_SCALES: Dict[str, tuple[int, int, int]] = {
+    "ADT": (9, 1, 7),
+    "EXT": (6, 1, 5),
+    "AGR": (6, 1, 5),
+    "CST": (6, 1, 5),
+    "NEU": (6, 1, 5),
+    "OPE": (6, 1, 5),
+    "EE": (9, 0, 6),
+    "DP": (5, 0, 6),
+    "PA": (8, 0, 6),
+    "AUT": (10, 1, 5),
+    "WKL": (5, 1, 5),
+    "POS": (10, 1, 7),
+}
+
+EMPLOYMENT = [
+    "School Teacher",
+    "Permanent (tenured/contracted full-time faculty)",
+    "Visiting/temporary faculty",
+    "Supervisor",
+]
+EMPLOYMENT_WEIGHTS = [0.85, 0.08, 0.05, 0.02]
+
+# Share of item responses left blank.
+MISSING_RATE = 0.01
+CHUNK_ROWS = 100_000
+
+
+def item_columns() -> list[str]:
+    return [f"{prefix}{i}" for prefix, (count, _, _) in ITEM_SCALES.items() for i in range(1, count + 1)]
+
+
+def _latent_scores(rng: np.random.Generator, n: int) -> Dict[str, np.ndarray]:
+    # Standardised trait scores with the relationships the pages plot:
+    # workload and neuroticism raise exhaustion, adaptability and support
+    # lower it, and adaptability's effect weakens as workload grows.
+    latent = {
+        prefix: rng.standard_normal(n)
+        for prefix in ("ADT", "EXT", "AGR", "CST", "NEU", "OPE", "AUT", "WKL", "POS")
+    }
+    adt, wkl = latent["ADT"], latent["WKL"]
+    latent["EE"] = (
+        0.4 * wkl + 0.35 * latent["NEU"] - 0.3 * adt - 0.25 * latent["POS"] + 0.15 * adt * wkl
+        + 0.7 * rng.standard_normal(n)
+    )
+    latent["DP"] = 0.5 * latent["EE"] - 0.2 * latent["EXT"] + 0.8 * rng.standard_normal(n)
+    latent["PA"] = 0.35 * latent["CST"] + 0.25 * adt + 0.2 * latent["AUT"] + 0.85 * rng.standard_normal(n)
+    return latent
+
+
+def generate_chunk(rng: np.random.Generator, n: int) -> pd.DataFrame:
+    """``n`` respondents with raw (uncleaned) headers like the source workbook."""
+    age = np.clip(rng.normal(37, 8, n).round(), 21, 65).astype(int)
+    experience = np.clip(age - 22 - rng.integers(0, 8, n), 0, None)
+    gender = rng.choice(np.array(["0", "1", "Prefer not to say"], dtype=object), n, p=[0.69, 0.3, 0.01])
+
+    columns: Dict[str, object] = {
+        "Age ": age,
+        "Gender_num": gender,
+        "What is your current employment status?": rng.choice(EMPLOYMENT, n, p=EMPLOYMENT_WEIGHTS),
+        "WorkExperienceYears": experience,
+        "HoursPerWeek": np.clip(rng.normal(45, 10, n).round(), 10, 90),
+    }
+    for prefix, latent in _latent_scores(rng, n).items():
+        count, low, high = ITEM_SCALES[prefix]
+        centre, spread = (low + high) / 2, (high - low) / 4
+        for i in range(1, count + 1):
+            values = np.clip(np.round(centre + spread * (0.8 * latent + 0.6 * rng.standard_normal(n))), low, high)
+            values[rng.random(n) < MISSING_RATE] = np.nan
+            columns[f"{prefix}{i}"] = values
+    return pd.DataFrame(columns)
+
+
+def iter_chunks(rows: int, seed: int = 0, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, chunk_rows):
+        yield generate_chunk(rng, min(chunk_rows, rows - start))
+
+
+def write_dataset(path: Path, rows: int, seed: int = 0) -> Path:
+    """Write ``rows`` synthetic respondents to ``path`` (.csv or .xlsx)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    suffix = path.suffix.lower()
+    tmp = path.with_name(f"{path.name}.tmp")
+    if suffix == ".csv":
+        for i, chunk in enumerate(iter_chunks(rows, seed)):
+            chunk.to_csv(tmp, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    elif suffix == ".xlsx":
+        pd.concat(iter_chunks(rows, seed), ignore_index=True).to_excel(tmp, index=False, engine="openpyxl")
+    else:
+        raise ValueError(f"Unsupported synthetic dataset format: {path.suffix}")
+    tmp.replace(path)
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--out", type=Path, required=True, help=".csv or .xlsx")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(write_dataset(args.out, args.rows, args.seed))
+
+
+if __name__ == "__main__":
+    main()
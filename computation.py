@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Hashable
+
+import streamlit as st
+
+from data_loader import get_dataset_key
+from instrumentation import count_cache, stage
+
+
+class PageGraph:
+    """Declared computation nodes for one page (data -> stats -> figure), memoized per session.
+
+    A node's version is built from the versions of everything it depends on,
+    either other nodes or widget values given to ``set_input``. ``value``
+    reruns a node only when that version differs from the one it last ran
+    with, so a widget change recomputes just the nodes downstream of it.
+    """
+
+    def __init__(self, page: str) -> None:
+        self.page = page
+        self._nodes: Dict[str, tuple[Callable[..., Any], tuple[str, ...]]] = {}
+        self._inputs: Dict[str, Hashable] = {}
+
+    def node(self, name: str, *deps: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """Register ``fn(*dep_values)`` as node ``name``."""
+        def register(fn: Callable[..., Any]) -> Callable[..., Any]:
+            self._nodes[name] = (fn, deps)
+            return fn
+        return register
+
+    def set_input(self, name: str, value: Hashable) -> Hashable:
+        self._inputs[name] = value
+        return value
+
+    def _memo(self) -> Dict[str, tuple[Hashable, Any]]:
+        return st.session_state.setdefault(f"_graph:{self.page}", {})
+
+    def version(self, name: str) -> Hashable:
+        if name in self._inputs:
+            return ("input", self._inputs[name])
+        _, deps = self._nodes[name]
+        return (name, get_dataset_key(), tuple(self.version(dep) for dep in deps))
+
+    def value(self, name: str) -> Any:
+        if name in self._inputs:
+            return self._inputs[name]
+        memo = self._memo()
+        version = self.version(name)
+        cached = memo.get(name)
+        if cached is not None and cached[0] == version:
+            count_cache(f"{self.page}.{name}", hit=True)
+            return cached[1]
+        fn, deps = self._nodes[name]
+        args = [self.value(dep) for dep in deps]
+        with stage(f"{self.page}.{name}") as record:
+            record.cache = "miss"
+            result = fn(*args)
+        memo[name] = (version, result)
+        return result
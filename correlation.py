@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from instrumentation import cached
+from lazy_imports import is_available, lazy
+from moments import PairwiseMoments
+from regression import t_pvalue
+
+_SCIPY_AVAILABLE = is_available("scipy")
+_hierarchy = lazy("scipy.cluster.hierarchy")
+_distance = lazy("scipy.spatial.distance")
+
+METHODS = ("pearson", "spearman")
+
+
+@dataclass(frozen=True)
+class CorrelationMatrix:
+    columns: tuple[str, ...]
+    method: str
+    r: np.ndarray
+    n: np.ndarray  # pairwise-complete observations behind each r
+    p: np.ndarray
+
+    def frame(self, values: str = "r") -> pd.DataFrame:
+        return pd.DataFrame(getattr(self, values), index=self.columns, columns=self.columns)
+
+    def pairs(self) -> pd.DataFrame:
+        """One row per unordered pair of distinct columns."""
+        i, j = np.triu_indices(len(self.columns), k=1)
+        return pd.DataFrame({
+            "Variable 1": np.asarray(self.columns)[i],
+            "Variable 2": np.asarray(self.columns)[j],
+            "r": self.r[i, j],
+            "N": self.n[i, j],
+            "p": self.p[i, j],
+        })
+
+    def reordered(self, order: Iterable[int]) -> CorrelationMatrix:
+        order = list(order)
+        idx = np.ix_(order, order)
+        return CorrelationMatrix(
+            columns=tuple(self.columns[k] for k in order),
+            method=self.method,
+            r=self.r[idx],
+            n=self.n[idx],
+            p=self.p[idx],
+        )
+
+
+def _ranks(values: np.ndarray) -> np.ndarray:
+    """Average ranks of each column over its own observed values; NaN stays NaN."""
+    ranked = np.full_like(values, np.nan)
+    for j in range(values.shape[1]):
+        observed = ~np.isnan(values[:, j])
+        ranked[observed, j] = pd.Series(values[observed, j]).rank(method="average").to_numpy()
+    return ranked
+
+
+def pairwise_correlation(values: np.ndarray, method: str = "pearson") -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Pairwise-complete r, N and two-sided p for every column pair from masked matrix products.
+
+    Spearman ranks each column once over all of its observed values, so it
+    matches ``DataFrame.corr(method="spearman")`` exactly when columns have no
+    missing values and closely otherwise.
+    """
+    if method == "spearman":
+        values = _ranks(values)
+    mask = ~np.isnan(values)
+    m = mask.astype(np.float64)
+    # Centring by the column mean keeps the sums of squares well conditioned.
+    x = np.where(mask, values - np.nanmean(values, axis=0), 0.0)
+
+    n = m.T @ m
+    sx = x.T @ m  # sx[i, j]: sum of column i over rows where j is also observed
+    sxx = (x * x).T @ m
+    sxy = x.T @ x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sxy - sx * sx.T / n
+        var_i = sxx - sx ** 2 / n
+        r = np.clip(cov / np.sqrt(var_i * var_i.T), -1.0, 1.0)
+    return r, n.astype(np.int64), _pvalues(r, n)
+
+
+def _pvalues(r: np.ndarray, n: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dof = n - 2
+        t = r * np.sqrt(dof / np.maximum(1 - r ** 2, 1e-300))
+        p = np.where(dof > 0, t_pvalue(t, np.maximum(dof, 1)), np.nan)
+    np.fill_diagonal(p, 0.0)
+    return p
+
+
+def correlation_from_moments(moments: PairwiseMoments) -> CorrelationMatrix:
+    """Pearson matrix from running moments; the same pairwise-complete r as from the rows behind them."""
+    r = moments.correlation()
+    return CorrelationMatrix(
+        columns=moments.columns,
+        method="pearson",
+        r=r,
+        n=moments.n.astype(np.int64),
+        p=_pvalues(r, moments.n),
+    )
+
+
+@cached("correlation.matrix", st.cache_data(show_spinner=False))
+def correlation_matrix(
+    dataset_key: str, _df: pd.DataFrame, columns: tuple[str, ...], method: str = "pearson"
+) -> CorrelationMatrix:
+    values = _df[list(columns)].to_numpy(dtype="float64", na_value=np.nan)
+    r, n, p = pairwise_correlation(values, method)
+    return CorrelationMatrix(columns=tuple(columns), method=method, r=r, n=n, p=p)
+
+
+def cluster_order(matrix: CorrelationMatrix) -> list[int]:
+    """Leaf order of an average-linkage tree on 1 - |r|; the input order without scipy."""
+    k = len(matrix.columns)
+    if not _SCIPY_AVAILABLE or k < 3:
+        return list(range(k))
+    distance = 1 - np.abs(np.nan_to_num(matrix.r, nan=0.0))
+    np.fill_diagonal(distance, 0.0)
+    condensed = _distance.squareform((distance + distance.T) / 2, checks=False)
+    tree = _hierarchy.linkage(condensed, method="average", optimal_ordering=True)
+    return [int(i) for i in _hierarchy.leaves_list(tree)]
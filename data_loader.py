@@ -1,13 +1,73 @@
 from __future__ import annotations
 
+from functools import lru_cache
+import hashlib
+import os
 from pathlib import Path
 import re
-from typing import Dict, Iterable
+from typing import Callable, Dict, Iterable, Iterator, Optional
 
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 import streamlit as st
 
-DATA_PATH = Path(__file__).resolve().parent / "dataset_dashboard.xlsx"
+from arrow_store import arrow_dir, current_version, fingerprint_of, map_version, publish, version_file
+from filters import FilterIndex, Selection, build_filter_index, selection_key, sidebar_filters
+from instrumentation import cached, stage, timed, timed_iter
+from process_memory import record_session
+from schema import SCALE_PREFIXES, DatasetSchema, build_schema, detect_source_roles
+from waves import (
+    POOLED,
+    WaveStatistics,
+    append_wave,
+    load_view,
+    manifest_version,
+    read_manifest,
+    view_statistics,
+    wave_selector,
+    waves_dir,
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    _PYARROW_AVAILABLE = True
+except ImportError:
+    _PYARROW_AVAILABLE = False
+
+# Alternative source file (.xlsx or .csv) served instead of the packaged
+# workbook, e.g. a synthetic dataset for benchmarking.
+DATA_PATH_ENV = "IMP_DASHBOARD_DATA"
+DATA_PATH = Path(
+    os.environ.get(DATA_PATH_ENV) or Path(__file__).resolve().parent / "dataset_dashboard.xlsx"
+).resolve()
+
+# Bump whenever the cleaning/encoding pipeline below changes so that
+# persisted caches built by an older pipeline are rebuilt.
+PIPELINE_VERSION = 4
+
+_FINGERPRINT_KEY = b"imp_dashboard.fingerprint"
+
+# Rows handed to the cleaning pipeline at a time when streaming a source file.
+CHUNK_ROWS = 10_000
+
+ProgressCallback = Callable[[float], None]
+
+_INT8_MIN, _INT8_MAX = -128, 127
+# Text columns with at most this share of distinct values are stored as categoricals.
+_CATEGORY_RATIO = 0.5
+
+# Filtered segments kept process-wide for quick switching between them.
+MAX_SHARED_SEGMENTS = 32
+
+# Columns besides the scale means that get a mean-centred "<col>_c" copy.
+_CENTERED_DEMOGRAPHICS = ["HoursPerWeek", "ExperienceYears", "WorkExperienceYears", "Age"]
+
+if int(pd.__version__.split(".")[0]) < 3:
+    # pandas 3 always copies on write; earlier versions must opt in so that
+    # per-session views of the shared dataset never write into its buffers.
+    pd.set_option("mode.copy_on_write", True)
 
 
 def _clean_columns(columns: Iterable[str]) -> list[str]:
@@ -15,11 +75,9 @@ def _clean_columns(columns: Iterable[str]) -> list[str]:
     return cleaned
 
 
-def _encode_gender(df: pd.DataFrame) -> None:
-    gender_cols = [c for c in df.columns if "gender" in c.lower()]
-    if not gender_cols:
+def _encode_gender(df: pd.DataFrame, col: Optional[str]) -> None:
+    if col is None:
         return
-    col = gender_cols[0]
     df[col] = df[col].astype(str).str.strip().str.lower()
     df["Gender_num"] = pd.to_numeric(
         df[col].replace({"male": 1, "m": 1, "female": 0, "f": 0}),
@@ -27,100 +85,634 @@ def _encode_gender(df: pd.DataFrame) -> None:
     )
 
 
-def _encode_age(df: pd.DataFrame) -> None:
-    age_cols = [c for c in df.columns if c.lower().startswith("age")]
-    if not age_cols:
+def _encode_age(df: pd.DataFrame, col: Optional[str]) -> None:
+    if col is None:
         return
-    col = age_cols[0]
     df[col] = pd.to_numeric(df[col], errors="coerce")
     df.rename(columns={col: "Age"}, inplace=True)
 
 
-def _encode_hours(df: pd.DataFrame) -> None:
-    hours_cols = [c for c in df.columns if "hours_per_week" in c.lower()]
-    if not hours_cols:
+def _encode_hours(df: pd.DataFrame, col: Optional[str]) -> None:
+    if col is None:
         return
-    col = hours_cols[0]
     df.rename(columns={col: "HoursPerWeek"}, inplace=True)
     df["HoursPerWeek"] = pd.to_numeric(df["HoursPerWeek"], errors="coerce")
 
 
-def _encode_experience(df: pd.DataFrame) -> None:
-    exp_cols = [c for c in df.columns if "experience" in c.lower() and "year" in c.lower()]
-    if not exp_cols:
+def _encode_experience(df: pd.DataFrame, col: Optional[str]) -> None:
+    if col is None:
         return
-    col = exp_cols[0]
     df.rename(columns={col: "ExperienceYears"}, inplace=True)
     df["ExperienceYears"] = pd.to_numeric(df["ExperienceYears"], errors="coerce")
     df["WorkExperienceYears"] = df["ExperienceYears"]
 
 
-def _compute_scale_means(df: pd.DataFrame, prefixes: Iterable[str]) -> Dict[str, pd.Series]:
+def _coerce_scale_items(df: pd.DataFrame, items: Dict[str, list[str]]) -> None:
+    for candidates in items.values():
+        df[candidates] = df[candidates].apply(pd.to_numeric, errors="coerce")
+
+
+def _compute_scale_means(df: pd.DataFrame, items: Dict[str, list[str]]) -> Dict[str, pd.Series]:
+    # Row means over the observed items, one scale's block of float64 at a
+    # time rather than a nullable row reduction over the int8 items.
     means: Dict[str, pd.Series] = {}
-    for prefix in prefixes:
-        candidates = [c for c in df.columns if c.upper().startswith(prefix.upper()) and c != prefix]
-        if not candidates:
-            continue
-        numeric = df.loc[:, candidates].apply(pd.to_numeric, errors="coerce")
-        df.loc[:, candidates] = numeric
-        means[prefix] = numeric.mean(axis=1)
+    for prefix, candidates in items.items():
+        values = df[candidates].to_numpy(dtype="float64", na_value=np.nan)
+        observed = ~np.isnan(values)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.where(observed, values, 0.0).sum(axis=1) / observed.sum(axis=1)
+        means[prefix] = pd.Series(mean, index=df.index)
     return means
 
 
-@st.cache_data(show_spinner=False)
-def load_dataset(path: Path = DATA_PATH) -> pd.DataFrame:
-    if not path.exists():
-        raise FileNotFoundError(path)
+def _mangle_header(header: Iterable[Optional[str]]) -> list[str]:
+    # Mirror pandas' naming of blank and duplicated header cells.
+    seen: Dict[str, int] = {}
+    names: list[str] = []
+    for idx, name in enumerate(header):
+        name = f"Unnamed: {idx}" if name is None else str(name)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _iter_xlsx_chunks(path: Path, chunk_rows: int) -> Iterator[tuple[pd.DataFrame, float]]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _mangle_header(header)
+        width = len(columns)
+        total = max((sheet.max_row or 0) - 1, 1)
+        read = 0
+        buffer: list[tuple] = []
+        for row in rows:
+            buffer.append(tuple(row[:width]) + (None,) * (width - len(row)))
+            if len(buffer) >= chunk_rows:
+                read += len(buffer)
+                yield pd.DataFrame.from_records(buffer, columns=columns), read / total
+                buffer = []
+        if buffer:
+            yield pd.DataFrame.from_records(buffer, columns=columns), 1.0
+    finally:
+        workbook.close()
+
+
+def _iter_csv_chunks(path: Path, chunk_rows: int) -> Iterator[tuple[pd.DataFrame, float]]:
+    total = max(path.stat().st_size, 1)
+    with open(path, "rb") as fh:
+        for chunk in pd.read_csv(fh, chunksize=chunk_rows):
+            yield chunk, fh.tell() / total
+
+
+def _iter_source_chunks(path: Path, chunk_rows: int = CHUNK_ROWS) -> Iterator[tuple[pd.DataFrame, float]]:
+    """Yield ``(raw_chunk, fraction_read)`` pairs without materialising the whole source."""
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        return _iter_csv_chunks(path, chunk_rows)
+    if suffix in {".xlsx", ".xlsm"}:
+        return _iter_xlsx_chunks(path, chunk_rows)
+    return iter([(pd.read_excel(path), 1.0)])
+
+
+@lru_cache(maxsize=8)
+def _content_hash(path: str, size: int, mtime_ns: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@timed("loader.fingerprint")
+def source_fingerprint(path: Path = DATA_PATH) -> str:
+    """Identify the source file contents and the pipeline version that processes them."""
+    stat = path.stat()
+    digest = _content_hash(str(path), stat.st_size, stat.st_mtime_ns)
+    return f"{stat.st_size}-{stat.st_mtime_ns}-{digest[:16]}-v{PIPELINE_VERSION}"
+
+
+def cache_path(path: Path = DATA_PATH) -> Path:
+    return path.with_name(f".{path.stem}.cache.parquet")
+
+
+def _cache_is_fresh(cache: Path, fingerprint: str) -> bool:
+    if not _PYARROW_AVAILABLE or not cache.exists():
+        return False
+    try:
+        metadata = pq.read_schema(cache).metadata or {}
+    except (OSError, pa.ArrowException):
+        return False
+    return metadata.get(_FINGERPRINT_KEY) == fingerprint.encode()
+
+
+@timed("loader.read_cache")
+def _read_cache(cache: Path, fingerprint: str) -> Optional[pd.DataFrame]:
+    if not _cache_is_fresh(cache, fingerprint):
+        return None
+    try:
+        return pq.read_table(cache).to_pandas()
+    except (OSError, pa.ArrowException):
+        return None
 
-    df = pd.read_excel(path)
 
-    df.columns = _clean_columns(df.columns)
+@timed("loader.write_cache")
+def _write_cache(df: pd.DataFrame, cache: Path, fingerprint: str) -> None:
+    if not _PYARROW_AVAILABLE:
+        return
+    tmp = cache.with_name(f"{cache.name}.{os.getpid()}.tmp")
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = {**(table.schema.metadata or {}), _FINGERPRINT_KEY: fingerprint.encode()}
+        pq.write_table(table.replace_schema_metadata(metadata), tmp)
+        os.replace(tmp, cache)
+    except (OSError, pa.ArrowException):
+        # The cache is an optimisation only; a read-only checkout still works.
+        tmp.unlink(missing_ok=True)
+
+
+def _clean_chunk(df: pd.DataFrame, roles: Dict[str, object]) -> pd.DataFrame:
     df = df.loc[:, [c for c in df.columns if c]]
-    df = df.dropna(axis=1, how="all")
-    df = df.dropna(how="all").reset_index(drop=True)
-
-    _encode_gender(df)
-    _encode_age(df)
-    _encode_hours(df)
-    _encode_experience(df)
-
-    scale_means = _compute_scale_means(
-        df,
-        [
-            "ADT",
-            "EXT",
-            "AGR",
-            "CST",
-            "NEU",
-            "OPE",
-            "EE",
-            "DP",
-            "PA",
-            "AUT",
-            "WKL",
-            "POS",
-        ],
+    df = df.dropna(how="all").copy()
+
+    _encode_gender(df, roles.get("gender"))
+    _encode_age(df, roles.get("age"))
+    _encode_hours(df, roles.get("hours"))
+    _encode_experience(df, roles.get("experience"))
+    _coerce_scale_items(df, roles["items"])
+    return df
+
+
+def _chunk_dtypes(roles: Dict[str, object]) -> Dict[str, str]:
+    """Storage dtypes fixed from the header roles before any rows are read."""
+    plan = {col: "Int8" for cols in roles["items"].values() for col in cols}
+    if roles.get("gender") is not None:
+        plan["Gender_num"] = "Int8"
+    return plan
+
+
+def _fits_int8(series: pd.Series) -> bool:
+    values = series.to_numpy(dtype="float64", na_value=np.nan)
+    values = values[~np.isnan(values)]
+    return values.size == 0 or bool(
+        (values == np.floor(values)).all() and values.min() >= _INT8_MIN and values.max() <= _INT8_MAX
     )
-    if scale_means:
-        df = df.assign(**scale_means)
 
+
+def _compact_chunk(df: pd.DataFrame, plan: Dict[str, str], widened: set[str]) -> pd.DataFrame:
+    """Cast a cleaned chunk to its storage dtypes so only compact pieces wait for the concat.
+
+    Planned int8 columns holding anything else (half points, out-of-range
+    codes) are added to ``widened`` and stored as float32 from then on.
+    """
+    casts: Dict[str, str] = {}
+    for col, dtype in plan.items():
+        if col not in df.columns:
+            continue
+        if col not in widened and not _fits_int8(df[col]):
+            widened.add(col)
+        casts[col] = "float32" if col in widened else dtype
+    for col in df.columns:
+        if col not in casts and (pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col])):
+            casts[col] = "category"
+    # Copy so untouched columns stop pinning the parser's 2-D float64 block.
+    return df.astype(casts).copy()
+
+
+def _concat_chunks(chunks: list[pd.DataFrame]) -> pd.DataFrame:
+    if len(chunks) == 1:
+        return chunks[0]
+    columns = chunks[0].columns
+    categorical = [
+        col for col in columns if any(isinstance(chunk[col].dtype, pd.CategoricalDtype) for chunk in chunks)
+    ]
+    merged: Dict[str, object] = {}
+    for col in categorical:
+        parts = [chunk[col] for chunk in chunks]
+        labelled = [part for part in parts if isinstance(part.dtype, pd.CategoricalDtype) and part.notna().any()]
+        empty = pd.CategoricalDtype(pd.Index([], dtype=labelled[0].cat.categories.dtype if labelled else object))
+        # Chunks where the column is entirely missing come through as float.
+        parts = [
+            part.astype(empty) if part.isna().all()
+            else part if isinstance(part.dtype, pd.CategoricalDtype)
+            else part.astype(object).astype("category")
+            for part in parts
+        ]
+        try:
+            merged[col] = union_categoricals(parts, sort_categories=True)
+        except TypeError:
+            # Mixed text and numbers: combine as objects, as a plain concat would.
+            merged[col] = pd.concat([part.astype(object) for part in parts], ignore_index=True).array
+    df = pd.concat([chunk.drop(columns=categorical) for chunk in chunks], ignore_index=True)
+    return df.assign(**merged)[list(columns)]
+
+
+def _centered(
+    df: pd.DataFrame, columns: Iterable[str], means: Optional[Dict[str, float]] = None
+) -> Dict[str, pd.Series]:
+    # Offsets come from ``means`` when given (running statistics of a wave
+    # view) and from the frame itself otherwise.
     centered: Dict[str, pd.Series] = {}
-    for col in [
-        *scale_means.keys(),
-        "HoursPerWeek",
-        "ExperienceYears",
-        "WorkExperienceYears",
-        "Age",
-    ]:
+    for col in columns:
+        if col not in df.columns:
+            continue
+        offset = df[col].mean() if means is None else means.get(col)
+        if offset is not None:
+            centered[f"{col}_c"] = df[col] - offset
+    return centered
+
+
+@timed("loader.finalize")
+def _finalize(df: pd.DataFrame, roles: Dict[str, object], center: bool = True) -> pd.DataFrame:
+    df = df.dropna(axis=1, how="all").reset_index(drop=True)
+
+    items = {
+        prefix: kept
+        for prefix in SCALE_PREFIXES
+        if (kept := [c for c in roles["items"].get(prefix, []) if c in df.columns])
+    }
+    with stage("loader.scale_means"):
+        scale_means = _compute_scale_means(df, items)
+        if scale_means:
+            df = df.assign(**scale_means)
+
+    with stage("loader.centering"):
+        centered = _centered(df, [*scale_means.keys(), *_CENTERED_DEMOGRAPHICS]) if center else {}
+        if centered:
+            df = df.assign(**centered)
+
+    with stage("loader.dtypes"):
+        plan = _plan_dtypes(
+            df,
+            integer_cols=[*(c for cols in items.values() for c in cols), "Gender_num"],
+            float_cols=[*scale_means.keys(), *centered.keys()],
+        )
+        return df.astype(plan)
+
+
+def _plan_dtypes(
+    df: pd.DataFrame, integer_cols: Iterable[str], float_cols: Iterable[str]
+) -> Dict[str, object]:
+    plan: Dict[str, object] = {}
+    for col in integer_cols:
         if col in df.columns:
-            centered[f"{col}_c"] = df[col] - df[col].mean()
-    if centered:
-        df = df.assign(**centered)
+            # Likert responses and 0/1 codes fit a nullable int8; anything else
+            # (half points from imputation, out-of-range codes) keeps float32.
+            plan[col] = "Int8" if _fits_int8(df[col]) else "float32"
+    for col in float_cols:
+        if col in df.columns:
+            plan[col] = "float32"
+    for col in df.columns:
+        series = df[col]
+        categorical = isinstance(series.dtype, pd.CategoricalDtype)
+        if col in plan or not (
+            categorical or pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+        ):
+            continue
+        # Chunks arrive with every text column categorical; only those with
+        # few distinct values stay that way.
+        few = series.nunique(dropna=True) <= max(len(series) * _CATEGORY_RATIO, 1)
+        if few and not categorical:
+            plan[col] = "category"
+        elif not few and categorical:
+            plan[col] = series.cat.categories.dtype
+    return plan
+
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    """Per-column bytes for the planned layout against the float64/object layout it replaces."""
+    after = df.memory_usage(deep=True, index=False)
+    before = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(series):
+            before[col] = series.astype(object).memory_usage(deep=True, index=False)
+        else:
+            before[col] = len(series) * 8
+    report = pd.DataFrame(
+        {
+            "dtype": df.dtypes.astype(str),
+            "before_bytes": pd.Series(before),
+            "after_bytes": after,
+        }
+    )
+    report["saved_bytes"] = report["before_bytes"] - report["after_bytes"]
+    return report.sort_values("saved_bytes", ascending=False)
+
+
+@timed("loader.ingest")
+def _ingest(path: Path, progress: Optional[ProgressCallback] = None, center: bool = True) -> pd.DataFrame:
+    # Raw chunks are cleaned, coerced and cast to their storage dtypes (planned
+    # once from the header) as they arrive, so only the compact typed pieces
+    # are held until the final concat.
+    chunks: list[pd.DataFrame] = []
+    roles: Optional[Dict[str, object]] = None
+    widened: set[str] = set()
+    for raw, fraction in timed_iter("loader.read", _iter_source_chunks(path)):
+        raw.columns = _clean_columns(raw.columns)
+        if roles is None:
+            roles = detect_source_roles(raw.columns)
+            plan = _chunk_dtypes(roles)
+        with stage("loader.clean_chunk"):
+            before = len(widened)
+            chunks.append(_compact_chunk(_clean_chunk(raw, roles), plan, widened))
+            if len(widened) > before:
+                # A later chunk widened a column: earlier pieces must match it.
+                chunks[:-1] = [
+                    chunk.astype({col: "float32" for col in widened if col in chunk.columns}) for chunk in chunks[:-1]
+                ]
+        del raw
+        if progress is not None:
+            progress(min(fraction, 1.0))
+    if not chunks:
+        return pd.DataFrame()
+    with stage("loader.concat"):
+        df = _concat_chunks(chunks)
+    del chunks
+    return _finalize(df, roles, center=center)
+
 
+def _materialize(path: Path, fingerprint: str, progress: Optional[ProgressCallback] = None) -> pd.DataFrame:
+    cache = cache_path(path)
+    df = _read_cache(cache, fingerprint)
+    if df is not None:
+        return df
+
+    df = _ingest(path, progress)
+    _write_cache(df, cache, fingerprint)
     return df
 
 
-def get_dataset() -> pd.DataFrame:
-    if "df" not in st.session_state:
-        st.session_state["df"] = load_dataset()
+@cached("loader.load_dataset", st.cache_data(show_spinner=False))
+def _load_dataset(path: Path, fingerprint: str) -> pd.DataFrame:
+    return _materialize(path, fingerprint)
+
+
+def _read_only(values):
+    buffers = [getattr(values, name, None) for name in ("_ndarray", "_data", "_mask")]
+    if all(not b.flags.writeable for b in buffers if isinstance(b, np.ndarray)):
+        # Already immutable, e.g. a view of a memory-mapped Arrow file.
+        return values
+    values = values.copy()
+    for name in ("_ndarray", "_data", "_mask"):
+        buffer = getattr(values, name, None)
+        if isinstance(buffer, np.ndarray):
+            buffer.flags.writeable = False
+    return values
+
+
+@timed("loader.freeze")
+def freeze_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Copy of ``df`` whose column buffers are non-writeable, safe to share between sessions."""
+    return pd.DataFrame(
+        {col: _read_only(df[col].array) for col in df.columns}, index=df.index, copy=False
+    )
+
+
+def _view_of(fingerprint: str) -> str:
+    return fingerprint.split("/", 1)[1]
+
+
+@cached("loader.running_statistics", st.cache_resource(show_spinner=False, max_entries=8))
+def _running_statistics(path: Path, fingerprint: str) -> Optional[WaveStatistics]:
+    return view_statistics(waves_dir(), _view_of(fingerprint))
+
+
+def _wave_view(path: Path, fingerprint: str) -> pd.DataFrame:
+    # Stored waves are processed but not centred: centring offsets depend on
+    # which waves are pooled, and come from their merged running means.
+    df = load_view(waves_dir(), _view_of(fingerprint))
+    with stage("loader.centering"):
+        means = _running_statistics(path, fingerprint).means()
+        columns = [*(p for p in SCALE_PREFIXES if p in df.columns), *_CENTERED_DEMOGRAPHICS]
+        centered = _centered(df, columns, means)
+        return df.assign(**{name: values.astype("float32") for name, values in centered.items()})
+
+
+@timed("loader.add_wave")
+def add_wave(path: Path, name: str, directory: Optional[Path] = None) -> dict:
+    """Process one wave's source file and append it to the wave store.
+
+    Costs one ingest of that file; stored waves are neither re-read nor
+    reprocessed. Adding a file already in the store returns its entry.
+    """
+    directory = directory or waves_dir()
+    if not path.exists():
+        raise FileNotFoundError(path)
+    fingerprint = source_fingerprint(path)
+    for wave in read_manifest(directory):
+        if wave["fingerprint"] == fingerprint:
+            return wave
+    return append_wave(directory, name, _ingest(path, center=False), path, fingerprint)
+
+
+@cached("loader.shared_dataset", st.cache_resource(show_spinner=False, max_entries=2))
+def _shared_dataset(path: Path, fingerprint: str) -> pd.DataFrame:
+    if waves_dir() is not None:
+        return freeze_frame(_wave_view(path, fingerprint))
+    directory = arrow_dir()
+    if directory is not None:
+        mapped = version_file(directory, path.stem, fingerprint)
+        if mapped.exists():
+            with stage("loader.map_arrow"):
+                df = map_version(mapped)
+            return freeze_frame(df)
+    return freeze_frame(_materialize(path, fingerprint))
+
+
+@cached("loader.shared_segment", st.cache_resource(show_spinner=False, max_entries=MAX_SHARED_SEGMENTS))
+def _shared_segment(
+    path: Path, fingerprint: str, key: str, _index: FilterIndex, _selection: Dict[str, tuple[str, ...]]
+) -> pd.DataFrame:
+    return freeze_frame(_shared_dataset(path, fingerprint).iloc[_index.resolve(_selection)])
+
+
+def _ensure_cache(path: Path, fingerprint: str, progress: Optional[ProgressCallback]) -> None:
+    cache = cache_path(path)
+    if progress is not None and not _cache_is_fresh(cache, fingerprint):
+        # Ingest outside the cache boundary: progress elements drawn inside
+        # it would be recorded and replayed on every cache hit.
+        _write_cache(_ingest(path, progress), cache, fingerprint)
+
+
+def _ensure_arrow_version(
+    path: Path, directory: Path, fingerprint: str, progress: Optional[ProgressCallback]
+) -> None:
+    version = current_version(directory)
+    if version is not None and fingerprint_of(version, path.stem) == fingerprint:
+        return
+    # Like _ensure_cache, this runs outside every cache boundary so a cold
+    # ingest reports its progress.
+    df = _materialize(path, fingerprint, progress)
+    with stage("loader.publish_arrow"):
+        publish(df, directory, path.stem, fingerprint)
+
+
+def load_dataset(
+    path: Path = DATA_PATH, progress: Optional[ProgressCallback] = None
+) -> pd.DataFrame:
+    if not path.exists():
+        raise FileNotFoundError(path)
+    fingerprint = source_fingerprint(path)
+    _ensure_cache(path, fingerprint, progress)
+    # Keying the in-memory cache on the fingerprint means an edited workbook
+    # is picked up on the next call instead of serving the stale frame.
+    return _load_dataset(path, fingerprint)
+
+
+def shared_dataset(
+    path: Path = DATA_PATH, progress: Optional[ProgressCallback] = None, view: Optional[str] = None
+) -> pd.DataFrame:
+    """Copy-on-write view of the one read-only dataset every session in this process shares.
+
+    The view costs no column copies; writing to it copies only the columns touched.
+    """
+    if path.exists() and waves_dir() is None:
+        directory = arrow_dir()
+        if directory is None:
+            _ensure_cache(path, source_fingerprint(path), progress)
+        else:
+            # A changed source is published before any session maps it.
+            _ensure_arrow_version(path, directory, source_fingerprint(path), progress)
+    return _shared_dataset(path, current_fingerprint(path, view)).copy(deep=False)
+
+
+def current_fingerprint(path: Path = DATA_PATH, view: Optional[str] = None) -> str:
+    """Fingerprint of the dataset version this process should serve.
+
+    With a shared Arrow directory configured, it is the source file's
+    fingerprint (``shared_dataset`` publishes that version), and workers
+    without the source file serve whatever version the pointer names. With
+    a wave store configured, it names the stored waves and the ``view`` (one
+    wave or all of them pooled); an empty store is seeded with the source
+    file as its first wave.
+    """
+    waves_directory = waves_dir()
+    if waves_directory is not None:
+        if not read_manifest(waves_directory):
+            add_wave(path, path.stem, waves_directory)
+        return f"waves-{manifest_version(waves_directory)}-v{PIPELINE_VERSION}/{view or POOLED}"
+
+    directory = arrow_dir()
+    if directory is None:
+        if not path.exists():
+            raise FileNotFoundError(path)
+        return source_fingerprint(path)
+
+    if path.exists():
+        return source_fingerprint(path)
+    version = current_version(directory)
+    if version is None:
+        raise FileNotFoundError(path)
+    return fingerprint_of(version, path.stem)
+
+
+@cached("loader.schema", st.cache_data(show_spinner=False))
+def _load_schema(path: Path, fingerprint: str) -> DatasetSchema:
+    return build_schema(_shared_dataset(path, fingerprint))
+
+
+@cached("loader.filter_index", st.cache_data(show_spinner=False))
+def _load_filter_index(path: Path, fingerprint: str) -> FilterIndex:
+    return build_filter_index(_shared_dataset(path, fingerprint))
+
+
+def _get_full_dataset() -> pd.DataFrame:
+    record_session()
+    view = st.session_state.get("wave", POOLED) if waves_dir() is not None else None
+    if "df" not in st.session_state or st.session_state.get("dataset_view") != view:
+        fingerprint = current_fingerprint(DATA_PATH, view)
+        st.session_state["dataset_key"] = fingerprint
+        st.session_state["dataset_view"] = view
+        placeholder = st.empty()
+
+        def _report(fraction: float) -> None:
+            placeholder.progress(fraction, text="Ingesting dataset…")
+
+        try:
+            st.session_state["df"] = shared_dataset(progress=_report, view=view)
+        finally:
+            placeholder.empty()
+        st.session_state["filter_index"] = _load_filter_index(DATA_PATH, fingerprint)
     return st.session_state["df"]
+
+
+def get_dataset() -> pd.DataFrame:
+    """This session's view of the shared dataset, restricted to the sidebar filter selection."""
+    directory = waves_dir()
+    if directory is not None:
+        st.session_state["wave"] = wave_selector(directory, st.session_state.get("wave", POOLED))
+    df = _get_full_dataset()
+    index: FilterIndex = st.session_state["filter_index"]
+    selection = sidebar_filters(index)
+    key = selection_key(selection)
+    st.session_state["selection"] = selection
+    st.session_state["selection_key"] = key
+    if not key:
+        st.sidebar.caption(f"{len(df):,} respondents")
+        return df
+
+    # Segments are shared read-only between sessions like the full dataset,
+    # so flipping between common segments is a cache hit for everyone.
+    fingerprint = st.session_state["dataset_key"]
+    subset = _shared_segment(DATA_PATH, fingerprint, key, index, selection).copy(deep=False)
+    st.sidebar.caption(f"{len(subset):,} of {len(df):,} respondents")
+    if subset.empty:
+        st.warning("No respondents match the selected filters.")
+        st.stop()
+    return subset
+
+
+def get_schema() -> DatasetSchema:
+    _get_full_dataset()
+    fingerprint = st.session_state["dataset_key"]
+    if st.session_state.get("schema_key") != fingerprint:
+        st.session_state["schema"] = _load_schema(DATA_PATH, fingerprint)
+        st.session_state["schema_key"] = fingerprint
+    return st.session_state["schema"]
+
+
+def get_running_statistics() -> Optional[WaveStatistics]:
+    """Running statistics of this session's rows, or None when there are none for them.
+
+    They exist only in wave mode and only while no filter is selected; pages
+    fall back to computing from the rows otherwise.
+    """
+    if waves_dir() is None:
+        return None
+    _get_full_dataset()
+    if st.session_state.get("selection_key"):
+        return None
+    return _running_statistics(DATA_PATH, st.session_state["dataset_key"])
+
+
+def get_filter_context() -> tuple[pd.DataFrame, FilterIndex, Selection]:
+    """The full shared dataset, its filter index and this session's selection.
+
+    For statistics kept per filter cell of the full dataset, which answer
+    any selection without its rows.
+    """
+    df = _get_full_dataset()
+    return df, st.session_state["filter_index"], st.session_state.get("selection", {})
+
+
+def get_full_fingerprint() -> str:
+    """Cache key of the full dataset, whatever the filter selection."""
+    _get_full_dataset()
+    return st.session_state["dataset_key"]
+
+
+def get_dataset_key() -> str:
+    """Cache key for statistics derived from this session's dataset and filter selection."""
+    _get_full_dataset()
+    selection = st.session_state.get("selection_key", "")
+    return f"{st.session_state['dataset_key']}:{selection}" if selection else st.session_state["dataset_key"]
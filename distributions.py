@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from instrumentation import cached
+
+# Evaluation points per KDE curve (seaborn's default gridsize).
+KDE_GRIDSIZE = 200
+# Points on the fine grid the samples are binned onto before the FFT convolution.
+KDE_FINE_GRID = 1024
+
+
+@dataclass(frozen=True)
+class DistributionSummary:
+    n: int
+    edges: np.ndarray
+    counts: np.ndarray
+    support: np.ndarray
+    density: np.ndarray  # KDE scaled to histogram counts, as histplot(kde=True) draws it
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """The parts ``plots.distribution`` draws, for a figure spec."""
+        return {"edges": self.edges, "counts": self.counts, "support": self.support, "density": self.density}
+
+
+def scott_bandwidth(values: np.ndarray) -> float:
+    return float(values.std(ddof=1) * len(values) ** (-1 / 5))
+
+
+def binned_kde(values: np.ndarray, bandwidth: float, support: np.ndarray) -> np.ndarray:
+    """Gaussian KDE evaluated on ``support`` via linear binning and an FFT convolution."""
+    pad = 4 * bandwidth
+    lo, hi = support[0] - pad, support[-1] + pad
+    grid = np.linspace(lo, hi, KDE_FINE_GRID)
+    delta = grid[1] - grid[0]
+
+    position = (values - lo) / delta
+    left = np.clip(np.floor(position).astype(np.int64), 0, KDE_FINE_GRID - 2)
+    frac = position - left
+    weights = np.bincount(left, 1 - frac, KDE_FINE_GRID) + np.bincount(left + 1, frac, KDE_FINE_GRID)
+
+    half = min(KDE_FINE_GRID - 1, int(np.ceil(pad / delta)))
+    offsets = np.arange(-half, half + 1) * delta
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+
+    size = 1 << int(np.ceil(np.log2(KDE_FINE_GRID + kernel.size)))
+    smoothed = np.fft.irfft(np.fft.rfft(weights, size) * np.fft.rfft(kernel, size), size)
+    density = smoothed[half:half + KDE_FINE_GRID] / len(values)
+    return np.interp(support, grid, density)
+
+
+def summarize_distribution(values: np.ndarray, bins: int = 20) -> DistributionSummary:
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        empty = np.array([])
+        return DistributionSummary(0, empty, empty, empty, empty)
+    counts, edges = np.histogram(values, bins=bins)
+    support = np.linspace(values.min(), values.max(), KDE_GRIDSIZE)
+    bandwidth = scott_bandwidth(values) if values.size > 1 else 0.0
+    if bandwidth > 0:
+        density = binned_kde(values, bandwidth, support) * values.size * (edges[1] - edges[0])
+    else:
+        density = np.full_like(support, np.nan)
+    return DistributionSummary(values.size, edges, counts, support, density)
+
+
+@cached("distributions.summaries", st.cache_data(show_spinner=False))
+def distribution_summaries(
+    dataset_key: str, _df: pd.DataFrame, columns: Iterable[str], bins: int = 20
+) -> Dict[str, DistributionSummary]:
+    """Histogram counts and KDE curve for each column, computed once per dataset."""
+    return {
+        col: summarize_distribution(_df[col].to_numpy(dtype="float64", na_value=np.nan), bins)
+        for col in columns
+    }
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, as_completed
+import io
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Hashable, Optional
+
+import streamlit as st
+
+from data_loader import get_dataset_key
+from figure_render import SAVEFIG_KWARGS, FigureSpec, fit_width, render_spec
+from instrumentation import count_cache, record_elapsed, stage
+from lazy_imports import lazy
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
+plt = lazy("matplotlib.pyplot")
+
+# Rendered images kept per process; least recently used entries go first.
+FIGURE_CACHE_BYTES = 64 * 1024 * 1024
+
+# Threads rendering figure specs; defaults to one per spare core.
+RENDER_WORKERS_ENV = "IMP_DASHBOARD_RENDER_WORKERS"
+MAX_RENDER_WORKERS = 8
+# A batch waits this long for the pool before drawing what is left itself.
+RENDER_TIMEOUT_S = 60
+
+
+class FigureCache:
+    """Thread-safe LRU of rendered figure bytes bounded by total size."""
+
+    def __init__(self, max_bytes: int = FIGURE_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: Hashable, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@st.cache_resource
+def get_figure_cache() -> FigureCache:
+    return FigureCache()
+
+
+def figure_bytes(fig: Figure, fmt: str = "png") -> bytes:
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format=fmt, **SAVEFIG_KWARGS)
+    finally:
+        plt.close(fig)
+    return fit_width(buffer.getvalue(), fmt)
+
+
+def render_figure(
+    figure_id: str, build: Callable[[], Optional[Figure]], *params: Hashable, fmt: str = "png"
+) -> Optional[bytes]:
+    """Return cached image bytes for ``figure_id``, building the figure only on a miss.
+
+    ``params`` must cover every widget value the figure depends on; the dataset
+    key is added automatically.
+    """
+    cache = get_figure_cache()
+    key = (get_dataset_key(), figure_id, params, fmt)
+    data = cache.get(key)
+    if data is not None:
+        count_cache(f"figure.{figure_id}", hit=True)
+        return data
+    with stage(f"figure.{figure_id}") as record:
+        record.cache = "miss"
+        fig = build()
+        if fig is None:
+            return None
+        data = figure_bytes(fig, fmt)
+    cache.put(key, data)
+    return data
+
+
+def show_image(data: Optional[bytes]) -> bool:
+    if data is None:
+        return False
+    st.image(data, width="stretch")
+    return True
+
+
+def show_figure(figure_id: str, build: Callable[[], Optional[Figure]], *params: Hashable) -> bool:
+    return show_image(render_figure(figure_id, build, *params))
+
+
+def render_workers() -> int:
+    value = os.environ.get(RENDER_WORKERS_ENV)
+    if value:
+        return max(1, int(value))
+    return max(1, min(MAX_RENDER_WORKERS, (os.cpu_count() or 1) - 1))
+
+
+@st.cache_resource
+def get_render_pool() -> Executor:
+    """Thread pool shared by every session; specs draw through the object-oriented Agg API.
+
+    Threads rather than forked processes: the server is multi-threaded (and
+    imports modules in the background), so a forked worker can inherit a
+    held import lock and never return. PNG encoding and resizing release the
+    GIL, and the page shows each figure as soon as it is done.
+    """
+    return ThreadPoolExecutor(max_workers=render_workers(), thread_name_prefix="figure-render")
+
+
+def _render_here(spec: FigureSpec, fmt: str) -> bytes:
+    # The pool did not deliver in time: render on this thread and start a
+    # fresh pool for the next figure.
+    get_render_pool.clear()
+    return render_spec(spec, fmt)
+
+
+def _place(entry: tuple, data: bytes) -> None:
+    placeholder, figure_id, _, _, _, started = entry
+    record_elapsed(f"figure.{figure_id}", time.perf_counter() - started, cache="miss")
+    placeholder.image(data, width="stretch")
+
+
+class FigureBatch:
+    """Figures rendered concurrently in the render pool, each streamed into its placeholder as it finishes.
+
+    ``show`` reserves the figure's place on the page and returns at once;
+    ``finish`` (or leaving a ``with`` block) fills the places in completion
+    order. Finished images go into the figure cache even if the script run
+    is interrupted before ``finish``.
+    """
+
+    def __init__(self) -> None:
+        self._pending: Dict[Future, tuple] = {}
+
+    def show(self, figure_id: str, build: Callable[[], Optional[FigureSpec]], *params: Hashable, fmt: str = "png") -> None:
+        """Like ``show_figure``, but ``build`` returns a spec and rendering happens off this thread."""
+        placeholder = st.empty()
+        cache = get_figure_cache()
+        key = (get_dataset_key(), figure_id, params, fmt)
+        data = cache.get(key)
+        if data is not None:
+            count_cache(f"figure.{figure_id}", hit=True)
+            placeholder.image(data, width="stretch")
+            return
+        started = time.perf_counter()
+        spec = build()
+        if spec is None:
+            return
+        future = get_render_pool().submit(render_spec, spec, fmt)
+
+        def store(done: Future) -> None:
+            if not done.cancelled() and done.exception() is None:
+                cache.put(key, done.result())
+
+        future.add_done_callback(store)
+        self._pending[future] = (placeholder, figure_id, key, spec, fmt, started)
+
+    def finish(self) -> None:
+        pending, self._pending = self._pending, {}
+        try:
+            for future in as_completed(list(pending), timeout=RENDER_TIMEOUT_S):
+                entry = pending.pop(future)
+                try:
+                    data = future.result()
+                except Exception as exc:
+                    entry[0].error(f"Error rendering figure: {exc}")
+                    continue
+                _place(entry, data)
+        except TimeoutError:
+            # A render that never returns must not hold the page.
+            for future, entry in pending.items():
+                future.cancel()
+                _, _, key, spec, fmt, _ = entry
+                data = _render_here(spec, fmt)
+                get_figure_cache().put(key, data)
+                _place(entry, data)
+
+    def __enter__(self) -> FigureBatch:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is None:
+            self.finish()
+        return False
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import io
+from typing import Any, Callable, Dict
+
+# Kept free of Streamlit and pyplot: render pool threads run only this module
+# (and the drawing functions specs name), and pyplot's global figure state
+# is not thread-safe.
+
+# Same output settings st.pyplot applies, so rendered images look identical.
+SAVEFIG_KWARGS = {"bbox_inches": "tight", "dpi": 200}
+
+# st.image decodes, downsizes and re-encodes any image wider than the
+# maximum content width on every call; storing the downsized PNG once lets
+# cache hits pass straight through.
+MAX_IMAGE_WIDTH = 2 * 730
+
+
+@dataclass(frozen=True)
+class FigureSpec:
+    """One figure as data: drawn by ``draw(fig, **data, **style)`` on a fresh Agg figure.
+
+    ``draw`` is a module-level function (see ``plots``) that touches only the
+    figure it is given; ``data`` carries the arrays and ``style`` the titles,
+    labels and colours.
+    """
+
+    draw: Callable[..., None]
+    figsize: tuple[float, float]
+    data: Dict[str, Any] = field(default_factory=dict)
+    style: Dict[str, Any] = field(default_factory=dict)
+
+
+def render_spec(spec: FigureSpec, fmt: str = "png") -> bytes:
+    """Draw ``spec`` with matplotlib's object-oriented Agg API; safe on any thread."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=spec.figsize)
+    FigureCanvasAgg(fig)
+    spec.draw(fig, **spec.data, **spec.style)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, **SAVEFIG_KWARGS)
+    return fit_width(buffer.getvalue(), fmt)
+
+
+def fit_width(data: bytes, fmt: str) -> bytes:
+    if fmt != "png":
+        return data
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    if image.width <= MAX_IMAGE_WIDTH:
+        return data
+    height = int(image.height * MAX_IMAGE_WIDTH / image.width)
+    buffer = io.BytesIO()
+    image.resize((MAX_IMAGE_WIDTH, height), resample=Image.BILINEAR).save(buffer, format="PNG")
+    return buffer.getvalue()
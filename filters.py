@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import hashlib
+from typing import Dict, Mapping
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+MISSING_LABEL = "Not reported"
+
+# Filter dimension -> (column, [(label, lower inclusive, upper exclusive)]).
+BANDS: Dict[str, tuple[str, list[tuple[str, float, float]]]] = {
+    "Gender": ("Gender_num", [("Female", 0, 1), ("Male", 1, 2)]),
+    "Age band": ("Age", [("Under 30", -np.inf, 30), ("30–39", 30, 40), ("40–49", 40, 50), ("50+", 50, np.inf)]),
+    "Experience band": (
+        "WorkExperienceYears",
+        [("Under 5 years", -np.inf, 5), ("5–9 years", 5, 10), ("10–19 years", 10, 20), ("20+ years", 20, np.inf)],
+    ),
+    "Hours band": ("HoursPerWeek", [("Under 40 h", -np.inf, 40), ("40–49 h", 40, 50), ("50+ h", 50, np.inf)]),
+}
+
+Selection = Dict[str, tuple[str, ...]]
+
+
+@dataclass(frozen=True)
+class FilterIndex:
+    """Packed row bitmaps for every (dimension, value) a respondent can be filtered on."""
+
+    n_rows: int
+    bitmaps: Dict[str, Dict[str, np.ndarray]]
+    counts: Dict[str, Dict[str, int]]
+
+    def options(self, dimension: str) -> list[str]:
+        return list(self.bitmaps[dimension])
+
+    def resolve(self, selection: Selection) -> np.ndarray:
+        """Row positions matching ``selection``: OR within a dimension, AND across dimensions."""
+        packed = np.full((self.n_rows + 7) // 8, 0xFF, dtype=np.uint8)
+        for dimension, values in selection.items():
+            if not values or dimension not in self.bitmaps:
+                continue
+            either = np.zeros_like(packed)
+            for value in values:
+                either |= self.bitmaps[dimension].get(value, 0)
+            packed &= either
+        return np.flatnonzero(np.unpackbits(packed, count=self.n_rows))
+
+    def cells(self) -> tuple[np.ndarray, np.ndarray]:
+        """Each row's cell (one option per dimension) and the code of every cell present.
+
+        Every selection is a union of whole cells, so anything mergeable that
+        is kept per cell can answer any selection without the rows.
+        """
+        codes = np.zeros(self.n_rows, dtype=np.int64)
+        stride = 1
+        for options in self.bitmaps.values():
+            # Rows outside every option of a dimension get a code of their own.
+            code = np.full(self.n_rows, len(options), dtype=np.int64)
+            for k, bitmap in enumerate(options.values()):
+                code[np.unpackbits(bitmap, count=self.n_rows).astype(bool)] = k
+            codes += code * stride
+            stride *= len(options) + 1
+        present, row_cells = np.unique(codes, return_inverse=True)
+        return row_cells, present
+
+    def select_cells(self, selection: Selection, cell_codes: np.ndarray) -> np.ndarray:
+        """Boolean mask over ``cell_codes`` of the cells that ``selection`` keeps."""
+        keep = np.ones(len(cell_codes), dtype=bool)
+        stride = 1
+        for dimension, options in self.bitmaps.items():
+            values = selection.get(dimension)
+            if values:
+                chosen = [k for k, option in enumerate(options) if option in values]
+                keep &= np.isin(cell_codes // stride % (len(options) + 1), chosen)
+            stride *= len(options) + 1
+        return keep
+
+
+def build_filter_index(df: pd.DataFrame) -> FilterIndex:
+    bitmaps: Dict[str, Dict[str, np.ndarray]] = {}
+    counts: Dict[str, Dict[str, int]] = {}
+    for dimension, (column, bands) in BANDS.items():
+        if column not in df.columns:
+            continue
+        values = df[column].to_numpy(dtype="float64", na_value=np.nan)
+        masks = {label: (values >= lo) & (values < hi) for label, lo, hi in bands}
+        missing = np.isnan(values)
+        if missing.any():
+            masks[MISSING_LABEL] = missing
+        bitmaps[dimension] = {label: np.packbits(mask) for label, mask in masks.items() if mask.any()}
+        counts[dimension] = {label: int(mask.sum()) for label, mask in masks.items() if mask.any()}
+    return FilterIndex(n_rows=len(df), bitmaps=bitmaps, counts=counts)
+
+
+def normalize_selection(index: FilterIndex, selection: Mapping[str, tuple[str, ...]]) -> Selection:
+    """Drop empty and all-values choices so equivalent selections share one key."""
+    normalized: Selection = {}
+    for dimension in index.bitmaps:
+        chosen = tuple(v for v in index.options(dimension) if v in selection.get(dimension, ()))
+        if chosen and len(chosen) < len(index.bitmaps[dimension]):
+            normalized[dimension] = chosen
+    return normalized
+
+
+def selection_key(selection: Selection) -> str:
+    """Short stable hash of a normalized selection; empty when nothing is filtered."""
+    if not selection:
+        return ""
+    text = ";".join(f"{dim}={','.join(values)}" for dim, values in sorted(selection.items()))
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+def sidebar_filters(index: FilterIndex) -> Selection:
+    """Render the respondent filters; choices persist in session state across pages."""
+    stored: Dict[str, tuple[str, ...]] = st.session_state.setdefault("filters", {})
+    st.sidebar.subheader("Respondent filters")
+    for dimension in index.bitmaps:
+        counts = index.counts[dimension]
+        chosen = st.sidebar.multiselect(
+            dimension,
+            index.options(dimension),
+            default=[v for v in stored.get(dimension, ()) if v in counts],
+            format_func=lambda value, counts=counts: f"{value} ({counts[value]})",
+            placeholder="All respondents",
+            key=f"filter_{dimension}",
+        )
+        stored[dimension] = tuple(chosen)
+    return normalize_selection(index, stored)
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from instrumentation import cached
+
+# Quantile cut points and group labels for the built-in split types.
+SPLITS: Dict[str, tuple[tuple[float, ...], tuple[str, ...]]] = {
+    "Median": ((0.5,), ("Low", "High")),
+    "Tertiles": ((1 / 3, 2 / 3), ("Low", "Mid", "High")),
+    "Quartiles": ((0.25, 0.5, 0.75), ("Q1", "Q2", "Q3", "Q4")),
+}
+CUSTOM_SPLIT = "Custom cut points"
+
+
+@dataclass(frozen=True)
+class ValueAggregates:
+    """Per distinct moderator value: row count plus count, sum and sum of squares of each target.
+
+    Every split of the moderator is a regrouping of these rows, so changing the
+    split never touches the raw data again.
+    """
+
+    moderator: str
+    targets: tuple[str, ...]
+    values: np.ndarray  # sorted distinct moderator values
+    counts: np.ndarray  # rows per value
+    n: np.ndarray  # (values x targets) non-missing target counts
+    total: np.ndarray
+    total_sq: np.ndarray
+
+
+def value_aggregates(df: pd.DataFrame, moderators: Iterable[str], targets: Iterable[str]) -> Dict[str, ValueAggregates]:
+    """Aggregate every target by every distinct value of every moderator in one bincount per statistic."""
+    moderators, targets = list(moderators), list(targets)
+    y = df[targets].to_numpy(dtype="float64", na_value=np.nan)
+    present = ~np.isnan(y)
+    y0 = np.where(present, y, 0.0)
+
+    uniques, codes, offsets = [], [], [0]
+    for mod in moderators:
+        m = df[mod].to_numpy(dtype="float64", na_value=np.nan)
+        keep = ~np.isnan(m)
+        values, inverse = np.unique(m[keep], return_inverse=True)
+        code = np.full(len(m), -1, dtype=np.int64)
+        code[keep] = inverse + offsets[-1]
+        uniques.append(values)
+        codes.append(code)
+        offsets.append(offsets[-1] + len(values))
+
+    # One flat index over (moderator, value) slots; rows with a missing
+    # moderator go to a trailing overflow slot that is dropped afterwards.
+    slots = offsets[-1]
+    flat = np.concatenate(codes) if codes else np.empty(0, dtype=np.int64)
+    flat = np.where(flat < 0, slots, flat)
+    reps = len(moderators)
+
+    def _bincount(weights: Optional[np.ndarray]) -> np.ndarray:
+        if weights is None:
+            return np.bincount(flat, minlength=slots + 1)[:slots]
+        tiled = np.tile(weights, reps)
+        return np.bincount(flat, weights=tiled, minlength=slots + 1)[:slots]
+
+    counts = _bincount(None)
+    n = np.column_stack([_bincount(present[:, j].astype(np.float64)) for j in range(len(targets))])
+    total = np.column_stack([_bincount(y0[:, j]) for j in range(len(targets))])
+    total_sq = np.column_stack([_bincount(y0[:, j] ** 2) for j in range(len(targets))])
+
+    return {
+        mod: ValueAggregates(
+            moderator=mod,
+            targets=tuple(targets),
+            values=uniques[i],
+            counts=counts[offsets[i]:offsets[i + 1]],
+            n=n[offsets[i]:offsets[i + 1]],
+            total=total[offsets[i]:offsets[i + 1]],
+            total_sq=total_sq[offsets[i]:offsets[i + 1]],
+        )
+        for i, mod in enumerate(moderators)
+    }
+
+
+@cached("grouping.context_aggregates", st.cache_data(show_spinner=False))
+def context_aggregates(
+    dataset_key: str, _df: pd.DataFrame, moderators: tuple[str, ...], targets: tuple[str, ...]
+) -> Dict[str, ValueAggregates]:
+    return value_aggregates(_df, moderators, targets)
+
+
+def weighted_quantiles(values: np.ndarray, counts: np.ndarray, q: Sequence[float]) -> np.ndarray:
+    """Quantiles of the data described by (value, count) pairs, matching ``Series.quantile``'s linear rule."""
+    total = int(counts.sum())
+    if total == 0:
+        return np.full(len(q), np.nan)
+    ends = np.cumsum(counts)
+    position = (total - 1) * np.asarray(q, float)
+    below, above = np.floor(position).astype(np.int64), np.ceil(position).astype(np.int64)
+    lo = values[np.searchsorted(ends, below, side="right")]
+    hi = values[np.searchsorted(ends, above, side="right")]
+    return lo + (hi - lo) * (position - below)
+
+
+def split_points(agg: ValueAggregates, split: str, custom: Sequence[float] = ()) -> tuple[np.ndarray, tuple[str, ...]]:
+    """Cut points and group labels; groups are closed on the right, as ``<= median`` is Low."""
+    if split == CUSTOM_SPLIT:
+        cuts = np.unique(np.asarray(custom, float))
+        bounds = [f"{c:g}" for c in cuts]
+        labels = [f"≤ {bounds[0]}"] if bounds else ["All"]
+        labels += [f"{a}–{b}" for a, b in zip(bounds[:-1], bounds[1:])]
+        labels += [f"> {bounds[-1]}"] if bounds else []
+        return cuts, tuple(labels)
+    quantiles, labels = SPLITS[split]
+    return weighted_quantiles(agg.values, agg.counts, quantiles), labels
+
+
+def grouped_stats(agg: ValueAggregates, cuts: np.ndarray, labels: Sequence[str]) -> pd.DataFrame:
+    """Count, mean, SD and SE of every target in each group, regrouped from the value aggregates."""
+    group = np.searchsorted(cuts, agg.values, side="left")
+    k = len(labels)
+    n = np.stack([np.bincount(group, agg.n[:, j], k) for j in range(len(agg.targets))], axis=1)
+    total = np.stack([np.bincount(group, agg.total[:, j], k) for j in range(len(agg.targets))], axis=1)
+    total_sq = np.stack([np.bincount(group, agg.total_sq[:, j], k) for j in range(len(agg.targets))], axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / n
+        var = np.maximum(total_sq - total * mean, 0.0) / (n - 1)
+        sd = np.sqrt(var)
+        se = sd / np.sqrt(n)
+
+    return pd.DataFrame({
+        "Moderator": agg.moderator,
+        "Group": np.repeat(list(labels), len(agg.targets)),
+        "Dimension": np.tile(agg.targets, k),
+        "N": n.ravel().astype(np.int64),
+        "Mean": mean.ravel(),
+        "SD": sd.ravel(),
+        "SE": se.ravel(),
+    })
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterable, Iterator, Optional, TypeVar
+
+import pandas as pd
+import streamlit as st
+
+# Off unless set: "1"/"time" records stage timings and cache hits, "memory"
+# also traces allocation peaks (tracemalloc slows every allocation, so that
+# mode is for investigating, not for production).
+PROFILE_ENV = "IMP_DASHBOARD_PROFILE"
+# JSON-lines destination for stage records; stderr when unset.
+PROFILE_LOG_ENV = "IMP_DASHBOARD_PROFILE_LOG"
+# Query parameter that opens the debug panel for one browser session.
+DEBUG_PARAM = "debug"
+
+MAX_SESSION_RECORDS = 200
+# Sessions whose recent stages are kept; the least recently active is
+# dropped first, so disconnected sessions do not accumulate.
+MAX_SESSIONS = 64
+
+T = TypeVar("T")
+
+_ENABLED = False
+_MEMORY = False
+
+_lock = threading.Lock()
+_local = threading.local()
+# stage -> [calls, total seconds, max seconds, cache hits, cache misses, max peak bytes]
+_totals: Dict[str, list] = {}
+_recent: OrderedDict[Optional[str], deque] = OrderedDict()
+
+_logger = logging.getLogger("imp_dashboard.stages")
+_logger.propagate = False
+
+
+def configure(mode: Optional[str] = None, log_path: Optional[str] = None) -> None:
+    """Switch recording on or off; ``mode`` is "time", "memory" or empty/None for off."""
+    global _ENABLED, _MEMORY
+    mode = (mode or "").strip().lower()
+    _ENABLED = mode in {"1", "true", "time", "memory"}
+    _MEMORY = mode == "memory"
+    if _MEMORY and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not _MEMORY and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+    for handler in list(_logger.handlers):
+        _logger.removeHandler(handler)
+        handler.close()
+    if _ENABLED:
+        handler = logging.FileHandler(log_path) if log_path else logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _logger.addHandler(handler)
+        _logger.setLevel(logging.INFO)
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def _session_id() -> Optional[str]:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+
+def _record(name: str, seconds: float, peak: Optional[int], cache: Optional[str], status: str) -> None:
+    session = _session_id()
+    entry = {
+        "ts": round(time.time(), 6),
+        "stage": name,
+        "seconds": round(seconds, 6),
+        "peak_bytes": peak,
+        "cache": cache,
+        "status": status,
+        "session": session,
+        "pid": os.getpid(),
+    }
+    with _lock:
+        totals = _totals.setdefault(name, [0, 0.0, 0.0, 0, 0, 0])
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] = max(totals[2], seconds)
+        if cache == "hit":
+            totals[3] += 1
+        elif cache == "miss":
+            totals[4] += 1
+        if peak is not None:
+            totals[5] = max(totals[5], peak)
+        records = _recent.get(session)
+        if records is None:
+            records = _recent[session] = deque(maxlen=MAX_SESSION_RECORDS)
+            while len(_recent) > MAX_SESSIONS:
+                _recent.popitem(last=False)
+        else:
+            _recent.move_to_end(session)
+        records.append(entry)
+    _logger.info(json.dumps(entry))
+
+
+class _Stage:
+    __slots__ = ("name", "cache", "_start", "_memory")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.cache: Optional[str] = None
+
+    def __enter__(self) -> "_Stage":
+        if _MEMORY:
+            # tracemalloc keeps one process-wide peak, so nested stages pass
+            # theirs up to the enclosing stage before resetting it.
+            frames = _local.__dict__.setdefault("memory", [])
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            self._memory = [current, current]
+            frames.append(self._memory)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        seconds = time.perf_counter() - self._start
+        peak = None
+        if _MEMORY and tracemalloc.is_tracing():
+            frames = _local.memory
+            frames.pop()
+            start, child_peak = self._memory
+            absolute = max(tracemalloc.get_traced_memory()[1], child_peak)
+            peak = absolute - start
+            if frames:
+                frames[-1][1] = max(frames[-1][1], absolute)
+        _record(self.name, seconds, peak, self.cache, "ok" if exc_type is None else exc_type.__name__)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value: object) -> None:
+        # Lets callers set ``.cache`` without checking whether recording is on.
+        pass
+
+    def __enter__(self) -> "_NullStage":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name: str):
+    """Context manager recording the wall time (and allocation peak) of the block as ``name``."""
+    return _Stage(name) if _ENABLED else _NULL_STAGE
+
+
+def timed(name: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Decorator form of ``stage``."""
+    def decorate(fn: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _ENABLED:
+                return fn(*args, **kwargs)
+            with _Stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def timed_iter(name: str, iterable: Iterable[T]) -> Iterator[T]:
+    """Yield from ``iterable``, recording each step that produces an item as ``name``."""
+    iterator = iter(iterable)
+    done = object()
+    while True:
+        with stage(name):
+            item = next(iterator, done)
+        if item is done:
+            return
+        yield item
+
+
+def record_elapsed(name: str, seconds: float, cache: Optional[str] = None) -> None:
+    """Record work timed outside a ``stage`` block, e.g. finished on a pool worker."""
+    if _ENABLED:
+        _record(name, seconds, None, cache, "ok")
+
+
+def count_cache(name: str, hit: bool) -> None:
+    """Count a lookup in a cache the app manages itself (figures, page graph nodes)."""
+    if _ENABLED:
+        _record(name, 0.0, None, "hit" if hit else "miss", "ok")
+
+
+def cached(name: str, cache: Callable[[Callable[..., T]], Callable[..., T]]) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Apply a Streamlit cache decorator to a function and record its calls as hits or misses.
+
+    Use in place of the decorator itself, e.g.
+    ``@cached("moderation.fits", st.cache_data(show_spinner=False))``.
+    """
+    def decorate(fn: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(fn)
+        def compute(*args, **kwargs):
+            # Only runs on a miss; Streamlit keys the cache on ``fn``'s own
+            # source and parameters through ``__wrapped__``.
+            _local.missed = True
+            return fn(*args, **kwargs)
+
+        cached_fn = cache(compute)
+
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            if not _ENABLED:
+                return cached_fn(*args, **kwargs)
+            outer = getattr(_local, "missed", False)
+            _local.missed = False
+            try:
+                with _Stage(name) as record:
+                    result = cached_fn(*args, **kwargs)
+                    record.cache = "miss" if _local.missed else "hit"
+            finally:
+                _local.missed = outer
+            return result
+
+        call.clear = cached_fn.clear
+        return call
+    return decorate
+
+
+def summary() -> pd.DataFrame:
+    """Process-wide totals per stage since start (or the last ``reset``)."""
+    with _lock:
+        rows = [(name, *values) for name, values in _totals.items()]
+    frame = pd.DataFrame(
+        rows, columns=["stage", "calls", "total_s", "max_s", "cache_hits", "cache_misses", "max_peak_bytes"]
+    )
+    frame["mean_ms"] = frame["total_s"] / frame["calls"].clip(lower=1) * 1000
+    return frame.sort_values("total_s", ascending=False, ignore_index=True)
+
+
+def session_records(session: Optional[str] = None) -> pd.DataFrame:
+    with _lock:
+        rows = list(_recent.get(session, ()))
+    return pd.DataFrame(rows, columns=["ts", "stage", "seconds", "peak_bytes", "cache", "status", "session", "pid"])
+
+
+def reset() -> None:
+    with _lock:
+        _totals.clear()
+        _recent.clear()
+
+
+def debug_panel() -> None:
+    """Sidebar panel with this session's recent stages and process-wide totals.
+
+    Shown only while recording is on and the URL carries ``?debug=1``.
+    """
+    if not _ENABLED or st.query_params.get(DEBUG_PARAM) not in {"1", "true"}:
+        return
+    with st.sidebar.expander("Debug: stage timings", expanded=True):
+        recent = session_records(_session_id())
+        if recent.empty:
+            st.caption("No stages recorded for this session yet.")
+        else:
+            st.caption("This session, most recent first")
+            st.dataframe(
+                recent.iloc[::-1][["stage", "seconds", "cache", "peak_bytes", "status"]],
+                hide_index=True,
+            )
+        st.caption("All sessions in this process")
+        st.dataframe(
+            summary()[["stage", "calls", "mean_ms", "max_s", "cache_hits", "cache_misses"]].round(4),
+            hide_index=True,
+        )
+
+
+configure(os.environ.get(PROFILE_ENV), os.environ.get(PROFILE_LOG_ENV))
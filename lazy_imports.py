@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import sys
+import threading
+import time
+from types import ModuleType
+from typing import Iterable, Optional
+
+import pandas as pd
+
+try:
+    import psutil
+    _PSUTIL_AVAILABLE = True
+except ImportError:
+    _PSUTIL_AVAILABLE = False
+
+# Plotting and statistics modules that only figure builders and a few
+# statistics need; together they cost several seconds in a fresh process.
+HEAVY_MODULES = (
+    "matplotlib.pyplot",
+    "seaborn",
+    "scipy.stats",
+    "scipy.cluster.hierarchy",
+    "PIL.Image",
+)
+
+# Fallback reference point for the startup profile when the real process
+# start time cannot be read.
+_MODULE_LOADED_AT = time.time()
+
+_lock = threading.Lock()
+_timings: list[tuple[str, str, float]] = []  # (module, how it was loaded, seconds)
+_first_paint: Optional[float] = None
+_warm_thread: Optional[threading.Thread] = None
+# Set once the warmer has imported (or failed to import) every module.
+_warmed = threading.Event()
+
+
+def is_available(name: str) -> bool:
+    """Whether ``name`` can be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ModuleNotFoundError:
+        return False
+
+
+def _import(name: str, how: str) -> ModuleType:
+    # import_module waits on the module lock if another thread is midway
+    # through the same import, so a half-initialised module is never returned.
+    already_loaded = name in sys.modules
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    if not already_loaded:
+        with _lock:
+            _timings.append((name, how, time.perf_counter() - start))
+    return module
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access."""
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = _import(self._name, "on demand")
+        return getattr(self._module, attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None or self._name in sys.modules else "deferred"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def _warm(names: list[str]) -> None:
+    try:
+        for name in names:
+            _import(name, "warmed")
+    finally:
+        _warmed.set()
+
+
+def warm_in_background(modules: Iterable[str] = HEAVY_MODULES) -> None:
+    """Import ``modules`` on a daemon thread, once per process.
+
+    The app's worker pools are threads. Anything that forks this process
+    must call ``wait_until_warm`` first: a child forked while the warmer
+    holds a module's import lock can never import that module.
+    """
+    global _warm_thread
+    with _lock:
+        if _warm_thread is not None:
+            return
+        names = [m for m in modules if m not in sys.modules and is_available(m)]
+        _warm_thread = threading.Thread(target=_warm, args=(names,), name="import-warmer", daemon=True)
+    _warm_thread.start()
+
+
+def wait_until_warm(timeout: Optional[float] = None) -> bool:
+    """Block until the background imports have finished; False if ``timeout`` passes first.
+
+    True at once when no warmer was started.
+    """
+    if _warm_thread is None:
+        return True
+    return _warmed.wait(timeout)
+
+
+def _process_start() -> float:
+    if _PSUTIL_AVAILABLE:
+        return psutil.Process().create_time()
+    return _MODULE_LOADED_AT
+
+
+def mark_first_paint() -> None:
+    """Record when the first page of this process finished rendering."""
+    global _first_paint
+    with _lock:
+        if _first_paint is None:
+            _first_paint = time.time()
+
+
+def startup_profile() -> tuple[Optional[float], pd.DataFrame]:
+    """Seconds from process start to first paint, and each heavy import's cost and trigger."""
+    with _lock:
+        first_paint = None if _first_paint is None else _first_paint - _process_start()
+        rows = list(_timings)
+    return first_paint, pd.DataFrame(rows, columns=["module", "loaded", "seconds"])
@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from instrumentation import cached
+from regression import t_critical
+from resampling import (
+    DEFAULT_SEED,
+    MAX_BLOCK_ELEMENTS,
+    bootstrap_count_chunks,
+    percentile_interval,
+    replicate_blocks,
+    run_blocks,
+)
+
+FOCAL = "ADT_c"
+GRID_POINTS = 100
+JN_POINTS = 200
+INTERACTION = 3  # position of the focal x moderator term in every design
+
+
+@dataclass(frozen=True)
+class ModerationFit:
+    """OLS fit of ``dv ~ focal * moderator + controls``."""
+
+    dv: str
+    focal: str
+    moderator: str
+    terms: tuple[str, ...]
+    coef: np.ndarray
+    cov: np.ndarray
+    n: int
+    dof: int
+    control_values: Dict[str, float]
+    moderator_mean: float
+    moderator_sd: float
+    moderator_range: tuple[float, float]
+    focal_range: tuple[float, float]
+
+    @property
+    def se(self) -> np.ndarray:
+        return np.sqrt(np.diag(self.cov))
+
+    def moderator_levels(self) -> Dict[str, float]:
+        return {
+            "Low": self.moderator_mean - self.moderator_sd,
+            "Mean": self.moderator_mean,
+            "High": self.moderator_mean + self.moderator_sd,
+        }
+
+    def design(self, focal: np.ndarray, moderator: np.ndarray) -> np.ndarray:
+        """Design rows for every (focal, moderator) pair, controls held at their reference values."""
+        focal, moderator = np.broadcast_arrays(np.asarray(focal, float), np.asarray(moderator, float))
+        columns = [np.ones_like(focal), focal, moderator, focal * moderator]
+        columns += [np.full_like(focal, self.control_values[c]) for c in self.terms[4:]]
+        return np.stack(columns, axis=-1)
+
+    def predict(self, focal: np.ndarray, moderator: np.ndarray) -> np.ndarray:
+        return self.design(focal, moderator) @ self.coef
+
+    def predict_se(self, focal: np.ndarray, moderator: np.ndarray) -> np.ndarray:
+        design = self.design(focal, moderator)
+        return np.sqrt(np.maximum(np.einsum("...i,ij,...j->...", design, self.cov, design), 0.0))
+
+    def simple_slopes(self, moderator: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Conditional slope of the focal predictor and its SE at each moderator value."""
+        moderator = np.asarray(moderator, float)
+        slope = self.coef[1] + self.coef[3] * moderator
+        var = self.cov[1, 1] + 2 * moderator * self.cov[1, 3] + moderator ** 2 * self.cov[3, 3]
+        return slope, np.sqrt(np.maximum(var, 0.0))
+
+
+def _reference_value(series: pd.Series, column: str) -> float:
+    # Binary codes are held at their most common value, continuous controls at the mean.
+    if column == "Gender_num":
+        return float(series.mode().iloc[0])
+    return float(series.mean())
+
+
+def _solve(x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Multi-target least squares via one QR of ``x``: coefficients, residual SS and (X'X)^-1."""
+    q, r = np.linalg.qr(x)
+    try:
+        r_inv = np.linalg.solve(r, np.eye(r.shape[0]))
+    except np.linalg.LinAlgError:
+        r_inv = np.linalg.pinv(r)
+    coef = r_inv @ (q.T @ y)
+    resid = y - x @ coef
+    return coef, (resid ** 2).sum(axis=0), r_inv @ r_inv.T
+
+
+def _design(
+    df: pd.DataFrame, moderator: str, dvs: list[str], controls: list[str], focal: str
+) -> tuple[pd.DataFrame, np.ndarray, np.ndarray, np.ndarray]:
+    """Float frame, full design matrix, target matrix and complete-design row mask."""
+    frame = df[[focal, moderator, *controls, *dvs]].astype("float64")
+    f, m = frame[focal].to_numpy(), frame[moderator].to_numpy()
+    design = np.column_stack([np.ones_like(f), f, m, f * m, frame[controls].to_numpy()])
+    return frame, design, frame[dvs].to_numpy(), ~np.isnan(design).any(axis=1)
+
+
+def fit_moderation_models(
+    df: pd.DataFrame,
+    moderator: str,
+    dvs: Iterable[str],
+    controls: Iterable[str],
+    focal: str = FOCAL,
+) -> Dict[str, ModerationFit]:
+    """Fit every DV against one shared design matrix; DVs with the same missing rows share one solve."""
+    dvs = list(dvs)
+    controls = [c for c in controls if c != moderator]
+    terms = ("Intercept", focal, moderator, f"{focal}:{moderator}", *controls)
+    frame, design, targets, design_ok = _design(df, moderator, dvs, controls, focal)
+
+    control_values = {c: _reference_value(frame[c], c) for c in controls}
+    shared = dict(
+        focal=focal,
+        moderator=moderator,
+        terms=terms,
+        control_values=control_values,
+        moderator_mean=float(frame[moderator].mean()),
+        moderator_sd=float(frame[moderator].std()),
+        moderator_range=(float(frame[moderator].min()), float(frame[moderator].max())),
+        focal_range=(float(frame[focal].min()), float(frame[focal].max())),
+    )
+
+    groups: Dict[bytes, list[int]] = {}
+    for j in range(len(dvs)):
+        rows = design_ok & ~np.isnan(targets[:, j])
+        groups.setdefault(np.packbits(rows).tobytes(), []).append(j)
+
+    fits: Dict[str, ModerationFit] = {}
+    for members in groups.values():
+        rows = design_ok & ~np.isnan(targets[:, members[0]])
+        x, y = design[rows], targets[np.ix_(rows, members)]
+        n, p = x.shape
+        coef, rss, xtx_inv = _solve(x, y)
+        dof = n - p
+        for k, j in enumerate(members):
+            sigma2 = rss[k] / dof if dof > 0 else np.nan
+            fits[dvs[j]] = ModerationFit(
+                dv=dvs[j], coef=coef[:, k], cov=sigma2 * xtx_inv, n=n, dof=dof, **shared
+            )
+    return fits
+
+
+@cached("moderation.fits", st.cache_data(show_spinner=False))
+def moderation_fits(
+    dataset_key: str,
+    _df: pd.DataFrame,
+    moderator: str,
+    dvs: tuple[str, ...],
+    controls: tuple[str, ...],
+) -> Dict[str, ModerationFit]:
+    return fit_moderation_models(_df, moderator, dvs, controls)
+
+
+def level_predictions(
+    fit: ModerationFit, points: int = GRID_POINTS, level: float = 0.95
+) -> tuple[np.ndarray, Dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]]]:
+    """Predicted DV and confidence band over the focal range at each moderator level."""
+    grid = np.linspace(*fit.focal_range, points)
+    levels = fit.moderator_levels()
+    focal, moderator = grid[None, :], np.fromiter(levels.values(), float)[:, None]
+    predicted = fit.predict(focal, moderator)
+    half = t_critical(max(fit.dof, 1), level) * fit.predict_se(focal, moderator)
+    return grid, {
+        label: (predicted[i], predicted[i] - half[i], predicted[i] + half[i])
+        for i, label in enumerate(levels)
+    }
+
+
+def simple_slope_table(fit: ModerationFit, level: float = 0.95) -> pd.DataFrame:
+    levels = fit.moderator_levels()
+    slope, se = fit.simple_slopes(np.fromiter(levels.values(), float))
+    half = t_critical(max(fit.dof, 1), level) * se
+    return pd.DataFrame({
+        "Level": list(levels),
+        "Moderator value": list(levels.values()),
+        "Slope": slope,
+        "SE": se,
+        "CI low": slope - half,
+        "CI high": slope + half,
+    })
+
+
+@dataclass(frozen=True)
+class JohnsonNeyman:
+    moderator: np.ndarray
+    slope: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+    significant: np.ndarray
+    boundaries: tuple[float, ...]
+    regions: tuple[tuple[float, float], ...]
+
+
+def johnson_neyman(fit: ModerationFit, points: int = JN_POINTS, level: float = 0.95) -> JohnsonNeyman:
+    """Simple slopes over a dense moderator grid plus the analytic regions of significance.
+
+    The slope b1 + b3*m is significant where (b1 + b3*m)^2 > t^2 * Var(b1 + b3*m);
+    the boundaries are the real roots of that quadratic in m.
+    """
+    crit = t_critical(max(fit.dof, 1), level)
+    grid = np.linspace(*fit.moderator_range, points)
+    slope, se = fit.simple_slopes(grid)
+
+    b1, b3 = fit.coef[1], fit.coef[3]
+    v11, v13, v33 = fit.cov[1, 1], fit.cov[1, 3], fit.cov[3, 3]
+    t2 = crit ** 2
+    quadratic = np.array([b3 ** 2 - t2 * v33, 2 * (b1 * b3 - t2 * v13), b1 ** 2 - t2 * v11])
+    roots = np.roots(quadratic) if np.isfinite(quadratic).all() else np.array([])
+    boundaries = tuple(sorted(float(r.real) for r in roots if abs(r.imag) < 1e-12))
+
+    # Significance can only change at a boundary, so testing one point per
+    # stretch between boundaries labels the whole observed range.
+    lo, hi = fit.moderator_range
+    cuts = np.array([lo, *(b for b in boundaries if lo < b < hi), hi])
+    mid_slope, mid_se = fit.simple_slopes((cuts[:-1] + cuts[1:]) / 2)
+    regions = tuple(
+        (float(start), float(end))
+        for start, end, sig in zip(cuts[:-1], cuts[1:], np.abs(mid_slope) > crit * mid_se)
+        if sig
+    )
+
+    return JohnsonNeyman(
+        moderator=grid,
+        slope=slope,
+        lower=slope - crit * se,
+        upper=slope + crit * se,
+        significant=np.abs(slope) > crit * se,
+        boundaries=boundaries,
+        regions=regions,
+    )
+
+
+def _batched_solve(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    try:
+        return np.linalg.solve(a, b[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        # A degenerate resample (e.g. one moderator value drawn) makes a stacked
+        # system singular; pinv keeps the rest of the block usable.
+        return (np.linalg.pinv(a) @ b[..., None])[..., 0]
+
+
+def _interaction_block(
+    shared: list[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]],
+    dv: int,
+    size: int,
+    seed: np.random.SeedSequence,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Bootstrap interaction coefficients and Freedman–Lane permutation t statistics for one block."""
+    x, y, reduced_fit, reduced_resid = shared[dv]
+    n, p = x.shape
+    rng = np.random.default_rng(seed)
+
+    # Case bootstrap as weighted normal equations: the resample counts W give
+    # X'WX and X'Wy for every replicate, summed one chunk of rows at a time
+    # as (B x chunk) @ (chunk x (p*p + p)) products.
+    moments = np.zeros((size, p * p + p))
+    for rows, counts in bootstrap_count_chunks(rng, n, size):
+        xr = x[rows]
+        moments += counts @ np.hstack([(xr[:, :, None] * xr[:, None, :]).reshape(len(xr), p * p), xr * y[rows, None]])
+    boot = _batched_solve(moments[:, : p * p].reshape(size, p, p), moments[:, p * p :])[:, INTERACTION]
+
+    # Permuting reduced-model residuals keeps X fixed, so every replicate
+    # shares one pseudo-inverse: coefficients are a single (B x n) @ (n x p).
+    # Replicates go through in sub-blocks of at most MAX_BLOCK_ELEMENTS values.
+    x_pinv = np.linalg.pinv(x)
+    xtx_inv = x_pinv @ x_pinv.T
+    t_perm = np.empty(size)
+    step = max(1, MAX_BLOCK_ELEMENTS // n)
+    for start in range(0, size, step):
+        reps = min(step, size - start)
+        order = rng.permuted(np.broadcast_to(np.arange(n), (reps, n)), axis=1)
+        y_star = reduced_fit + reduced_resid[order]
+        del order
+        coef = y_star @ x_pinv.T
+        y_star -= coef @ x.T
+        rss = np.einsum("ij,ij->i", y_star, y_star)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t_perm[start : start + reps] = coef[:, INTERACTION] / np.sqrt(
+                rss / (n - p) * xtx_inv[INTERACTION, INTERACTION]
+            )
+    return boot, t_perm
+
+
+def interaction_resampling(
+    df: pd.DataFrame,
+    moderator: str,
+    dvs: Iterable[str],
+    controls: Iterable[str],
+    n_reps: int = 2000,
+    seed: int = DEFAULT_SEED,
+    n_jobs: Optional[int] = 1,
+    level: float = 0.95,
+    focal: str = FOCAL,
+) -> pd.DataFrame:
+    """Bootstrap CI and permutation p-value for the focal x moderator term of each DV."""
+    dvs = list(dvs)
+    controls = [c for c in controls if c != moderator]
+    _, design, targets, design_ok = _design(df, moderator, dvs, controls, focal)
+    fits = fit_moderation_models(df, moderator, dvs, controls, focal)
+    reduced_cols = [c for c in range(design.shape[1]) if c != INTERACTION]
+
+    shared, tasks, owners = [], [], []
+    for j, dv in enumerate(dvs):
+        rows = design_ok & ~np.isnan(targets[:, j])
+        x, y = design[rows], targets[rows, j]
+        reduced, _, _ = _solve(x[:, reduced_cols], y[:, None])
+        reduced_fit = (x[:, reduced_cols] @ reduced)[:, 0]
+        shared.append((x, y, reduced_fit, y - reduced_fit))
+        for size, child in replicate_blocks(n_reps, seed):
+            tasks.append((j, size, child))
+            owners.append(dv)
+    blocks = run_blocks(_interaction_block, tasks, n_jobs, shared=shared)
+
+    records = []
+    for dv in dvs:
+        fit = fits[dv]
+        mine = [block for block, owner in zip(blocks, owners) if owner == dv]
+        boot = np.concatenate([b for b, _ in mine])
+        t_perm = np.concatenate([t for _, t in mine])
+        estimate, se = fit.coef[INTERACTION], fit.se[INTERACTION]
+        t_obs = estimate / se
+        low, high = percentile_interval(boot, level)
+        exceed = np.count_nonzero(np.abs(t_perm[~np.isnan(t_perm)]) >= abs(t_obs))
+        records.append({
+            "DV": dv,
+            "Term": fit.terms[INTERACTION],
+            "N": fit.n,
+            "Estimate": estimate,
+            "SE": se,
+            "t": t_obs,
+            "Bootstrap SE": np.nanstd(boot, ddof=1),
+            "Bootstrap CI low": low,
+            "Bootstrap CI high": high,
+            "Permutation p": (exceed + 1) / (np.count_nonzero(~np.isnan(t_perm)) + 1),
+            "Replicates": n_reps,
+        })
+    return pd.DataFrame.from_records(records)
+
+
+@cached("moderation.inference", st.cache_data(show_spinner=False))
+def interaction_inference(
+    dataset_key: str,
+    _df: pd.DataFrame,
+    moderator: str,
+    dvs: tuple[str, ...],
+    controls: tuple[str, ...],
+    n_reps: int = 2000,
+    seed: int = DEFAULT_SEED,
+    n_jobs: Optional[int] = 1,
+) -> pd.DataFrame:
+    return interaction_resampling(_df, moderator, dvs, controls, n_reps, seed, n_jobs)
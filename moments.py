@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Sequence
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class PairwiseMoments:
+    """Pairwise-complete counts, means and co-moments of a set of columns.
+
+    Entry ``[i, j]`` of every matrix covers the rows where columns ``i`` and
+    ``j`` are both observed, so covariances and correlations match the
+    pairwise-complete ones computed from the raw rows. Two batches of rows
+    combine with ``merge`` in O(columns²), whatever their size (Chan et al.'s
+    pairwise form of Welford's update), so statistics over appended rows
+    never need the earlier rows again.
+    """
+
+    columns: tuple[str, ...]
+    n: np.ndarray  # n[i, j]: rows where i and j are both observed
+    mean: np.ndarray  # mean[i, j]: mean of column i over those rows
+    m2: np.ndarray  # m2[i, j]: sum of squared deviations of column i over those rows
+    comoment: np.ndarray  # comoment[i, j]: sum of (x_i - mean[i, j]) (x_j - mean[j, i])
+
+    @classmethod
+    def from_values(cls, columns: Sequence[str], values: np.ndarray) -> PairwiseMoments:
+        """Moments of the rows of ``values`` (NaN for missing), one pass of masked matrix products."""
+        mask = ~np.isnan(values)
+        m = mask.astype(np.float64)
+        # Shift by each column's mean first so the sums stay well conditioned.
+        with np.errstate(invalid="ignore"):
+            shift = np.nan_to_num(np.nanmean(values, axis=0)) if len(values) else np.zeros(values.shape[1])
+        x = np.where(mask, values - shift, 0.0)
+
+        n = m.T @ m
+        s = x.T @ m  # s[i, j]: sum of shifted column i over rows where j is observed
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_shifted = np.where(n > 0, s / n, 0.0)
+        m2 = (x * x).T @ m - s * mean_shifted
+        comoment = x.T @ x - s * mean_shifted.T
+        return cls(
+            columns=tuple(columns),
+            n=n,
+            mean=np.where(n > 0, mean_shifted + shift[:, None], np.nan),
+            m2=m2,
+            comoment=comoment,
+        )
+
+    @classmethod
+    def empty(cls, columns: Sequence[str]) -> PairwiseMoments:
+        k = len(columns)
+        return cls(
+            columns=tuple(columns),
+            n=np.zeros((k, k)),
+            mean=np.full((k, k), np.nan),
+            m2=np.zeros((k, k)),
+            comoment=np.zeros((k, k)),
+        )
+
+    def subset(self, columns: Iterable[str]) -> PairwiseMoments:
+        """The same moments restricted to ``columns``, which must all be present."""
+        positions = {col: i for i, col in enumerate(self.columns)}
+        order = [positions[col] for col in columns]
+        idx = np.ix_(order, order)
+        return PairwiseMoments(
+            columns=tuple(self.columns[i] for i in order),
+            n=self.n[idx],
+            mean=self.mean[idx],
+            m2=self.m2[idx],
+            comoment=self.comoment[idx],
+        )
+
+    def aligned(self, columns: Sequence[str]) -> PairwiseMoments:
+        """Moments over ``columns``; columns this batch never saw get zero counts."""
+        if tuple(columns) == self.columns:
+            return self
+        positions = {col: i for i, col in enumerate(self.columns)}
+        out = PairwiseMoments.empty(columns)
+        present = [(k, positions[col]) for k, col in enumerate(columns) if col in positions]
+        if present:
+            dst, src = zip(*present)
+            for name in ("n", "mean", "m2", "comoment"):
+                getattr(out, name)[np.ix_(dst, dst)] = getattr(self, name)[np.ix_(src, src)]
+        return out
+
+    def merge(self, other: PairwiseMoments) -> PairwiseMoments:
+        """Moments of the union of both batches' rows."""
+        columns = self.columns + tuple(c for c in other.columns if c not in self.columns)
+        a, b = self.aligned(columns), other.aligned(columns)
+        n = a.n + b.n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weight = np.where(n > 0, a.n * b.n / n, 0.0)
+            delta = np.where((a.n > 0) & (b.n > 0), b.mean - a.mean, 0.0)
+            mean = np.where(a.n == 0, b.mean, np.where(b.n == 0, a.mean, a.mean + delta * b.n / n))
+        return PairwiseMoments(
+            columns=columns,
+            n=n,
+            mean=np.where(n > 0, mean, np.nan),
+            m2=a.m2 + b.m2 + delta * delta * weight,
+            comoment=a.comoment + b.comoment + delta * delta.T * weight,
+        )
+
+    def column_count(self) -> np.ndarray:
+        return np.diag(self.n).copy()
+
+    def column_mean(self) -> np.ndarray:
+        return np.diag(self.mean).copy()
+
+    def column_sd(self) -> np.ndarray:
+        n = self.column_count()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(n > 1, np.sqrt(np.diag(self.m2) / (n - 1)), np.nan)
+
+    def covariance(self) -> np.ndarray:
+        """Pairwise-complete sample covariance matrix."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.n > 1, self.comoment / (self.n - 1), np.nan)
+
+    def correlation(self) -> np.ndarray:
+        """Pairwise-complete Pearson r, each pair standardised over its own rows."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = self.comoment / np.sqrt(self.m2 * self.m2.T)
+        return np.clip(r, -1.0, 1.0)
+
+    def to_arrays(self, prefix: str) -> dict[str, np.ndarray]:
+        return {
+            f"{prefix}columns": np.asarray(self.columns, dtype=str),
+            f"{prefix}n": self.n,
+            f"{prefix}mean": self.mean,
+            f"{prefix}m2": self.m2,
+            f"{prefix}comoment": self.comoment,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix: str) -> PairwiseMoments:
+        return cls(
+            columns=tuple(str(c) for c in arrays[f"{prefix}columns"]),
+            n=arrays[f"{prefix}n"],
+            mean=arrays[f"{prefix}mean"],
+            m2=arrays[f"{prefix}m2"],
+            comoment=arrays[f"{prefix}comoment"],
+        )
@@ -1,15 +1,31 @@
-import math
-
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
 
-from data_loader import get_dataset
+from data_loader import (
+    get_dataset,
+    get_dataset_key,
+    get_filter_context,
+    get_full_fingerprint,
+    get_running_statistics,
+    get_schema,
+)
+from distributions import distribution_summaries
+from figure_cache import FigureBatch
+from figure_render import FigureSpec
+from instrumentation import debug_panel, stage, timed
+from lazy_imports import lazy
+import plots
+from reliability import BOOTSTRAP_AUTO_ROWS, bootstrap_reliability, reliability_from_moments, reliability_tables
+from resampling import suggested_jobs
+from summary_stats import DEFAULT_ROLES, column_roles, role_columns, summary_table
+
+# Seaborn (for its palettes) loads on first use (or is warmed by app.py), not on page import.
+sns = lazy("seaborn")
 
 try:
     df = get_dataset()
+    schema = get_schema()
 except FileNotFoundError:
     st.error("Packaged dataset missing. Please place 'Data_Sheet _Cleaned_Final.csv' beside app.py.")
     st.stop()
@@ -21,7 +37,7 @@ col1, col2, col3 = st.columns(3)
 
 col1.metric("Total Respondents", len(df))
 
-if "Gender_num" in df.columns:
+if schema.has("Gender_num"):
     male_pct = df["Gender_num"].mean() * 100
     col2.metric("Male (%)", f"{male_pct:.1f}%")
     col3.metric("Female (%)", f"{100 - male_pct:.1f}%")
@@ -29,7 +45,7 @@ else:
     col2.write("Gender unavailable")
 
 # Age metric
-if "Age" in df.columns:
+if schema.has("Age"):
     age = df["Age"].dropna()
     if not age.empty:
         st.metric("Age Range", f"{int(age.min())} – {int(age.max())}")
@@ -37,58 +53,78 @@ if "Age" in df.columns:
 # --- Summary Statistics ---
 st.subheader("Summary Statistics")
 
-summary = df.describe().T
+full_df, filter_index, selection = get_filter_context()
+roles = column_roles(schema, full_df)
+shown_roles = st.multiselect(
+    "Columns:", list(roles), default=[role for role in DEFAULT_ROLES if role in roles]
+)
+with stage("overview.summary"):
+    summary = summary_table(
+        get_dataset_key(),
+        get_full_fingerprint(),
+        tuple(role_columns(roles, shown_roles)),
+        full_df,
+        filter_index,
+        selection,
+    )
 st.dataframe(summary)
+st.caption("Quartiles are approximate on large datasets (merged quantile sketches).")
 
 # --- Scale Reliability (Cronbach's Alpha) ---
 st.subheader("Scale Reliability (Cronbach's α)")
 
-scale_definitions = {
-    "Adaptability": "ADT",
-    "Extraversion": "EXT",
-    "Agreeableness": "AGR",
-    "Conscientiousness": "CST",
-    "Neuroticism": "NEU",
-    "Openness": "OPE",
-    "Emotional Exhaustion": "EE",
-    "Depersonalisation": "DP",
-    "Personal Accomplishment": "PA",
-    "Autonomy": "AUT",
-    "Workload": "WKL",
-    "Perceived Organizational Support": "POS",
-}
-
-def cronbach_alpha(item_data: pd.DataFrame) -> float:
-    """Compute Cronbach's alpha for a set of items."""
-    item_data = item_data.dropna()
-    if item_data.empty or item_data.shape[1] < 2:
-        return np.nan
-    
-    item_vars = item_data.var(axis=0, ddof=1)
-    total_var = item_data.sum(axis=1).var(ddof=1)
-    n_items = item_data.shape[1]
-    
-    if total_var == 0:
-        return np.nan
-    
-    alpha = (n_items / (n_items - 1)) * (1 - item_vars.sum() / total_var)
-    return alpha
-
-reliability_results = []
-for scale_name, prefix in scale_definitions.items():
-    item_cols = [c for c in df.columns if c.upper().startswith(prefix.upper()) and c != prefix and not c.endswith("_c")]
-    if len(item_cols) >= 2:
-        item_data = df[item_cols].apply(pd.to_numeric, errors="coerce")
-        alpha = cronbach_alpha(item_data)
-        reliability_results.append({
-            "Scale": scale_name,
-            "Items": len(item_cols),
-            "Cronbach's α": f"{alpha:.3f}" if not np.isnan(alpha) else "N/A"
-        })
-
-if reliability_results:
-    reliability_df = pd.DataFrame(reliability_results)
-    st.dataframe(reliability_df, hide_index=True)
+with stage("overview.reliability"):
+    running = get_running_statistics()
+    if running is not None:
+        # Wave store: item covariances are kept up to date as waves arrive.
+        scale_table, item_table = reliability_from_moments(schema, running.scales)
+    else:
+        scale_table, item_table = reliability_tables(get_dataset_key(), df, schema)
+
+
+def _fmt(value: float) -> str:
+    return f"{value:.3f}" if not np.isnan(value) else "N/A"
+
+
+def _fmt_ci(low: float, high: float) -> str:
+    return f"[{low:.2f}, {high:.2f}]" if not (np.isnan(low) or np.isnan(high)) else "N/A"
+
+
+@st.fragment
+@timed("overview.reliability_section")
+def reliability_section():
+    # Resampling every respondent 1,000 times is only automatic on small
+    # datasets; the toggle reruns just this table.
+    show_intervals = st.toggle("Bootstrap 95% intervals", value=len(df) <= BOOTSTRAP_AUTO_ROWS)
+    table = scale_table
+    if show_intervals:
+        with st.spinner("Resampling respondents..."):
+            bootstrap_table = bootstrap_reliability(get_dataset_key(), df, schema, n_jobs=suggested_jobs(len(df)))
+        table = table.merge(bootstrap_table, on="Prefix", how="left")
+
+    columns = {"Scale": table["Scale"], "Items": table["Items"], "Cronbach's α": table["alpha"].map(_fmt)}
+    if show_intervals:
+        columns["α 95% CI"] = [_fmt_ci(lo, hi) for lo, hi in zip(table["alpha_low"], table["alpha_high"])]
+    columns["Standardized α"] = table["standardized_alpha"].map(_fmt)
+    if show_intervals:
+        columns["Mean"] = table["mean"].map(_fmt)
+        columns["Mean 95% CI"] = [_fmt_ci(lo, hi) for lo, hi in zip(table["mean_low"], table["mean_high"])]
+    st.dataframe(pd.DataFrame(columns), hide_index=True)
+    if show_intervals:
+        st.caption("95% percentile bootstrap intervals from 1,000 resamples of respondents (fixed seed).")
+
+
+if not scale_table.empty:
+    reliability_section()
+
+    with st.expander("Item diagnostics (α if item deleted, corrected item–total r)"):
+        st.dataframe(
+            item_table.rename(columns={
+                "alpha_if_deleted": "α if item deleted",
+                "item_total_r": "Corrected item–total r",
+            }).round(3),
+            hide_index=True,
+        )
 
 # --- Histograms ---
 st.subheader("Distribution Snapshots")
@@ -110,28 +146,33 @@ hist_targets = [
 
 numeric_targets = [
     (label, col) for label, col in hist_targets
-    if col in df.columns and pd.api.types.is_numeric_dtype(df[col])
+    if schema.has(col) and pd.api.types.is_numeric_dtype(df[col])
 ]
 
-if numeric_targets:
-    cols_per_row = 3
-    rows = math.ceil(len(numeric_targets) / cols_per_row)
-    fig, axes = plt.subplots(rows, cols_per_row, figsize=(cols_per_row * 6.5, rows * 5.0))
-    axes = axes.flatten()
-
-    palette = sns.color_palette("viridis", len(numeric_targets))
+def histogram_spec(index, label, col):
+    summaries = distribution_summaries(get_dataset_key(), df, tuple(col for _, col in numeric_targets))
+    color = sns.color_palette("viridis", len(numeric_targets))[index]
+    return FigureSpec(plots.distribution, (6.5, 5.0), data=summaries[col].arrays(), style={"color": color, "title": label})
 
-    for ax, (label, col), color in zip(axes, numeric_targets, palette):
-        sns.histplot(df[col].dropna(), kde=True, bins=20, ax=ax, color=color)
-        ax.set_title(label, fontsize=9)
-        ax.set_xlabel("")
-        ax.set_ylabel("")
-        ax.grid(axis="y", linestyle="--", alpha=0.4)
 
-    for ax in axes[len(numeric_targets):]:
-        ax.remove()
-
-    fig.tight_layout()
-    st.pyplot(fig, width='stretch')
+if numeric_targets:
+    # Panels are independent figures: the render pool draws them in parallel
+    # and each appears as soon as it is done.
+    cols_per_row = 3
+    with FigureBatch() as figures:
+        for start in range(0, len(numeric_targets), cols_per_row):
+            row = enumerate(numeric_targets[start:start + cols_per_row], start)
+            for column, (index, (label, col)) in zip(st.columns(cols_per_row), row):
+                with column:
+                    figures.show(
+                        "overview.histogram",
+                        lambda index=index, label=label, col=col: histogram_spec(index, label, col),
+                        index,
+                        label,
+                        col,
+                        len(numeric_targets),
+                    )
 else:
     st.info("No numeric columns available for histogram view.")
+
+debug_panel()
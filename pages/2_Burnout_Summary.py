@@ -1,52 +1,66 @@
 import streamlit as st
-import seaborn as sns
-import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
 
-from data_loader import get_dataset
+from data_loader import get_dataset, get_dataset_key, get_schema
+from distributions import distribution_summaries
+from computation import PageGraph
+from figure_cache import FigureBatch
+from figure_render import FigureSpec
+from instrumentation import debug_panel, stage, timed
+from grouping import CUSTOM_SPLIT, SPLITS, context_aggregates, grouped_stats, split_points
+import plots
 
 st.title("Burnout Summary")
 
 try:
     df = get_dataset()
+    schema = get_schema()
 except FileNotFoundError:
     st.error("Packaged dataset missing. Please place 'Data_Sheet _Cleaned_Final.csv' beside app.py.")
     st.stop()
 
+# Figures render in the pool while the rest of the page runs; finish() at the
+# end streams any still outstanding into their places.
+figures = FigureBatch()
+
 # --- Comparative Burnout Dimensions ---
 st.subheader("Comparative Burnout Dimensions (Emotional Exhaustion, Depersonalisation, Personal Accomplishment)")
 
 cols = ["EE", "DP", "PA"]
-available_cols = [c for c in cols if c in df.columns]
+available_cols = schema.available(cols)
 
 if len(available_cols) >= 2:
-    burnout_stats = []
-    for col in available_cols:
-        data = df[col].dropna()
-        burnout_stats.append({
-            "Dimension": col,
-            "Mean": data.mean(),
-            "Std": data.std()
-        })
-    
-    stats_df = pd.DataFrame(burnout_stats)
-    
-    fig, ax = plt.subplots(figsize=(8, 5))
-    x_pos = np.arange(len(stats_df))
-    
-    bars = ax.bar(x_pos, stats_df["Mean"], yerr=stats_df["Std"], 
-                   capsize=8, alpha=0.8, color=["#e74c3c", "#e67e22", "#3498db"])
-    
-    ax.set_xlabel("Burnout Dimension", fontsize=12)
-    ax.set_ylabel("Mean Score", fontsize=12)
-    ax.set_title("Comparative Burnout Dimensions with Variability", fontsize=14)
-    ax.set_xticks(x_pos)
-    ax.set_xticklabels(stats_df["Dimension"])
-    ax.grid(axis="y", linestyle="--", alpha=0.3)
-    
-    fig.tight_layout()
-    st.pyplot(fig, width='stretch')
+    with stage("burnout.comparison_stats"):
+        burnout_stats = []
+        for col in available_cols:
+            data = df[col].dropna()
+            burnout_stats.append({
+                "Dimension": col,
+                "Mean": data.mean(),
+                "Std": data.std()
+            })
+
+        stats_df = pd.DataFrame(burnout_stats)
+
+    def comparison_spec():
+        return FigureSpec(
+            plots.comparison_bars,
+            (8, 5),
+            data={
+                "labels": list(stats_df["Dimension"]),
+                "means": stats_df["Mean"].to_numpy(),
+                "sds": stats_df["Std"].to_numpy(),
+            },
+            style={
+                "colors": ["#e74c3c", "#e67e22", "#3498db"],
+                "title": "Comparative Burnout Dimensions with Variability",
+                "xlabel": "Burnout Dimension",
+                "ylabel": "Mean Score",
+            },
+        )
+
+    figures.show("burnout.comparison", comparison_spec, tuple(available_cols))
 
 st.divider()
 
@@ -54,24 +68,32 @@ st.divider()
 st.subheader("Individual Burnout Distributions")
 
 cols = ["EE", "DP", "PA"]
-available_dist_cols = [c for c in cols if c in df.columns]
+available_dist_cols = schema.available(cols)
+
+colors = ["#e74c3c", "#e67e22", "#3498db"]
+
+
+def distribution_spec(idx, col):
+    summaries = distribution_summaries(get_dataset_key(), df, tuple(available_dist_cols))
+    return FigureSpec(
+        plots.distribution,
+        (5.5, 4.5),
+        data=summaries[col].arrays(),
+        style={
+            "color": colors[idx],
+            "title": f"{col} Distribution",
+            "title_size": 11,
+            "xlabel": col,
+            "ylabel": "Frequency",
+            "grid_alpha": 0.3,
+        },
+    )
+
 
 if available_dist_cols:
-    fig, axes = plt.subplots(1, len(available_dist_cols), figsize=(len(available_dist_cols) * 5.5, 4.5))
-    if len(available_dist_cols) == 1:
-        axes = [axes]
-    
-    colors = ["#e74c3c", "#e67e22", "#3498db"]
-    
-    for idx, (ax, col) in enumerate(zip(axes, available_dist_cols)):
-        sns.histplot(df[col].dropna(), kde=True, bins=20, ax=ax, color=colors[idx])
-        ax.set_title(f"{col} Distribution", fontsize=11)
-        ax.set_xlabel(col)
-        ax.set_ylabel("Frequency")
-        ax.grid(axis="y", linestyle="--", alpha=0.3)
-    
-    fig.tight_layout()
-    st.pyplot(fig, width='stretch')
+    for column, (idx, col) in zip(st.columns(len(available_dist_cols)), enumerate(available_dist_cols)):
+        with column:
+            figures.show("burnout.distribution", lambda idx=idx, col=col: distribution_spec(idx, col), idx, col)
 
 # --- Burnout by Organisational Context ---
 st.divider()
@@ -89,65 +111,96 @@ burnout_dimensions = [
     ("PA", "Personal Accomplishment", "#3498db")
 ]
 
-available_moderators = [(col, label) for col, label in moderators if col in df.columns]
-available_burnout = [(col, label, color) for col, label, color in burnout_dimensions if col in df.columns]
+available_moderators = [(col, label) for col, label in moderators if schema.has(col)]
+available_burnout = [(col, label, color) for col, label, color in burnout_dimensions if schema.has(col)]
+
+
+# Computation nodes: value aggregates -> grouped table. The split controls
+# live in a fragment, so changing them only regroups the aggregates.
+graph = PageGraph("burnout")
+
+
+@graph.node("aggregates")
+def compute_aggregates():
+    return context_aggregates(
+        get_dataset_key(),
+        df,
+        tuple(col for col, _ in available_moderators),
+        tuple(col for col, _, _ in available_burnout),
+    )
+
+
+@graph.node("context_table", "aggregates", "split", "custom_cuts")
+def context_table(aggregates, split, custom_cuts):
+    tables = []
+    for mod_col, _ in available_moderators:
+        agg = aggregates[mod_col]
+        # A moderator with a single observed value cannot be split
+        if len(agg.values) < 2:
+            continue
+        cuts, labels = split_points(agg, split, custom_cuts)
+        tables.append(grouped_stats(agg, cuts, labels))
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+
+
+def context_spec(table):
+    mod_labels = dict(available_moderators)
+    plotted = list(dict.fromkeys(table["Moderator"]))
+    groups = list(dict.fromkeys(table["Group"]))
+    panels = []
+    for burnout_col, burnout_label, _ in available_burnout:
+        rows = table[table["Dimension"] == burnout_col].set_index(["Moderator", "Group"])
+        stats = [rows.xs(group, level="Group").reindex(plotted) for group in groups]
+        panels.append((
+            burnout_label,
+            np.array([group_stats["Mean"].to_numpy() for group_stats in stats]),
+            np.array([group_stats["SE"].to_numpy() for group_stats in stats]),
+        ))
+    return FigureSpec(
+        plots.grouped_bars,
+        (len(available_burnout) * 6, 5),
+        data={"categories": [mod_labels[col] for col in plotted], "groups": groups, "panels": panels},
+        style={"suptitle": "Burnout Across Organisational Contexts", "xlabel": "Organisational Factor"},
+    )
+
+
+@st.fragment
+@timed("burnout.context_section")
+def context_section():
+    split = graph.set_input("split", st.selectbox("Split moderators by:", [*SPLITS, CUSTOM_SPLIT], index=0))
+    custom_cuts: tuple[float, ...] = ()
+    if split == CUSTOM_SPLIT:
+        raw_cuts = st.text_input("Cut points (comma-separated moderator scores):", value="2.5, 3.5")
+        try:
+            custom_cuts = tuple(float(v) for v in raw_cuts.split(",") if v.strip())
+        except ValueError:
+            st.warning("Cut points must be numbers, e.g. 2.5, 3.5.")
+    graph.set_input("custom_cuts", custom_cuts)
+
+    table = graph.value("context_table")
+    if not table.empty:
+        with FigureBatch() as batch:
+            batch.show(
+                "burnout.context",
+                lambda: context_spec(table),
+                tuple(available_moderators),
+                tuple(available_burnout),
+                split,
+                custom_cuts,
+            )
+        st.caption("Bars show group means ± 1 SE; groups are closed on the right (values at a cut point fall in the lower group).")
+        with st.expander("Group statistics"):
+            st.dataframe(table.round(3), hide_index=True)
+
 
 if available_moderators and available_burnout:
-    # Create single figure with all three charts
-    fig, axes = plt.subplots(1, len(available_burnout), figsize=(len(available_burnout) * 6, 5))
-    if len(available_burnout) == 1:
-        axes = [axes]
-    
-    for idx, (burnout_col, burnout_label, burnout_color) in enumerate(available_burnout):
-        ax = axes[idx]
-        
-        context_data = []
-        mod_categories = []
-        
-        for mod_col, mod_label in available_moderators:
-            mod_series = df[mod_col].dropna()
-            if mod_series.nunique() < 2:
-                continue
-                
-            median_val = mod_series.median()
-            
-            low_mask = df[mod_col] <= median_val
-            high_mask = df[mod_col] > median_val
-            
-            low_burnout = df.loc[low_mask, burnout_col].mean()
-            high_burnout = df.loc[high_mask, burnout_col].mean()
-            
-            context_data.append(low_burnout)
-            context_data.append(high_burnout)
-            mod_categories.extend([f"Low", f"High"])
-        
-        if context_data:
-            # Create grouped structure
-            n_mods = len(available_moderators)
-            x_positions = np.arange(n_mods)
-            width = 0.35
-            
-            low_values = [context_data[i*2] for i in range(n_mods)]
-            high_values = [context_data[i*2 + 1] for i in range(n_mods)]
-            
-            ax.bar(x_positions - width/2, low_values, width, label="Low", 
-                   color="#3498db", alpha=0.8, edgecolor="black", linewidth=0.8)
-            ax.bar(x_positions + width/2, high_values, width, label="High", 
-                   color="#e74c3c", alpha=0.8, edgecolor="black", linewidth=0.8)
-            
-            ax.set_xlabel("Organisational Factor", fontsize=11)
-            ax.set_ylabel(f"Mean {burnout_label}", fontsize=11)
-            ax.set_title(f"{burnout_label}", fontsize=12, fontweight='bold')
-            ax.set_xticks(x_positions)
-            ax.set_xticklabels([label for _, label in available_moderators], fontsize=9)
-            ax.legend(fontsize=9)
-            ax.grid(axis="y", linestyle="--", alpha=0.3)
-    
-    fig.suptitle("Burnout Across Organisational Contexts", fontsize=14, fontweight='bold', y=1.02)
-    fig.tight_layout()
-    st.pyplot(fig, width='stretch')
-    
+    context_section()
+
     st.info("Burnout prevalence is markedly higher under conditions of high workload and low organisational support, highlighting the role of contextual stressors.")
 else:
     pass
     # st.warning("Required variables not available for organisational context analysis.")
+
+figures.finish()
+
+debug_panel()
@@ -2,19 +2,34 @@ import math
 
 import streamlit as st
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
+import numpy as np
 
-from data_loader import get_dataset
+from computation import PageGraph
+from correlation import cluster_order, correlation_from_moments, correlation_matrix
+from data_loader import get_dataset, get_dataset_key, get_running_statistics, get_schema
+from figure_cache import render_figure, show_image
+from instrumentation import debug_panel, timed
+from lazy_imports import lazy
+from regression import plot_regression, regression_summaries, scatter_sample
+
+# Plotting libraries load on first use (or are warmed by app.py), not on page import.
+plt = lazy("matplotlib.pyplot")
+sns = lazy("seaborn")
 
 st.title("Exploratory Data Insights")
 
 try:
     df = get_dataset()
+    schema = get_schema()
 except FileNotFoundError:
     st.error("Packaged dataset missing. Please place 'Data_Sheet _Cleaned_Final.csv' beside app.py.")
     st.stop()
 
+# Computation nodes: regressions/scatter sample -> predictor figure, and
+# correlations -> ordering -> heatmap figure. Each section runs in its own
+# fragment, so a widget only recomputes the nodes downstream of it.
+graph = PageGraph("insights")
+
 # --- Baseline Relationships with Burnout Dimensions ---
 st.subheader("Baseline Relationships with Burnout Dimensions")
 
@@ -27,85 +42,121 @@ predictor_options = {
     "Perceived Organizational Support": ("POS", "Perceived organisational support shows a consistent protective relationship across burnout dimensions.")
 }
 
-selected_predictor = st.selectbox(
-    "Select predictor to explore:",
-    list(predictor_options.keys()),
-    index=0
-)
-
-predictor_code, interpretation = predictor_options[selected_predictor]
 burnout_dims = ["EE", "DP", "PA"]
 burnout_labels = {
     "EE": "Emotional Exhaustion",
-    "DP": "Depersonalisation", 
+    "DP": "Depersonalisation",
     "PA": "Personal Accomplishment"
 }
+available_burnout = schema.available(burnout_dims)
 
-if predictor_code == "personality":
-    # Big Five subset: Neuroticism vs EE, Conscientiousness vs PA, Extraversion vs DP
-    personality_pairs = [
-        ("NEU", "EE", "Neuroticism vs Emotional Exhaustion"),
-        ("CST", "PA", "Conscientiousness vs Personal Accomplishment"),
-        ("EXT", "DP", "Extraversion vs Depersonalisation")
-    ]
-    
-    valid_pairs = [
-        (pred, outcome, title) for pred, outcome, title in personality_pairs
-        if pred in df.columns and outcome in df.columns
-    ]
-    
-    if valid_pairs:
-        fig, axes = plt.subplots(1, len(valid_pairs), figsize=(len(valid_pairs) * 5.5, 4.8))
-        if len(valid_pairs) == 1:
-            axes = [axes]
-        
-        for ax, (pred, outcome, title) in zip(axes, valid_pairs):
-            sns.regplot(
-                x=df[pred], y=df[outcome], ax=ax,
-                scatter_kws={"alpha": 0.5, "color": "#9b59b6"},
-                line_kws={"color": "#e74c3c", "linewidth": 2}
-            )
-            ax.set_title(title, fontsize=11)
-            ax.set_xlabel(pred)
-            ax.set_ylabel(burnout_labels[outcome])
-            ax.grid(axis="both", linestyle="--", alpha=0.3)
-        
-        fig.tight_layout()
-        st.pyplot(fig, width='stretch')
-        st.info(interpretation)
-    else:
-        st.warning("Required personality trait data not available.")
-        
-else:
-    # Single predictor vs all three burnout dimensions
-    if predictor_code in df.columns:
-        available_burnout = [dim for dim in burnout_dims if dim in df.columns]
-        
-        if available_burnout:
-            fig, axes = plt.subplots(1, len(available_burnout), figsize=(len(available_burnout) * 5.5, 4.8))
-            if len(available_burnout) == 1:
-                axes = [axes]
-            
-            colors_map = {"EE": "#e74c3c", "DP": "#e67e22", "PA": "#3498db"}
-            
-            for ax, outcome in zip(axes, available_burnout):
-                sns.regplot(
-                    x=df[predictor_code], y=df[outcome], ax=ax,
-                    scatter_kws={"alpha": 0.5, "color": colors_map[outcome]},
-                    line_kws={"color": "#2c3e50", "linewidth": 2}
-                )
-                ax.set_title(f"{burnout_labels[outcome]} vs {selected_predictor}", fontsize=11)
-                ax.set_xlabel(selected_predictor)
-                ax.set_ylabel(burnout_labels[outcome])
-                ax.grid(axis="both", linestyle="--", alpha=0.3)
-            
-            fig.tight_layout()
-            st.pyplot(fig, width='stretch')
+# Big Five subset: Neuroticism vs EE, Conscientiousness vs PA, Extraversion vs DP
+personality_pairs = [
+    ("NEU", "EE", "Neuroticism vs Emotional Exhaustion"),
+    ("CST", "PA", "Conscientiousness vs Personal Accomplishment"),
+    ("EXT", "DP", "Extraversion vs Depersonalisation")
+]
+valid_pairs = [
+    (pred, outcome, title) for pred, outcome, title in personality_pairs
+    if schema.has(pred, outcome)
+]
+
+
+@graph.node("regressions")
+def compute_regressions():
+    # Every (predictor, burnout dimension) fit in one pass, shared by all selectbox options
+    regression_predictors = schema.available(["ADT", "WKL", "AUT", "POS", "NEU", "CST", "EXT"])
+    return regression_summaries(get_dataset_key(), df, tuple(regression_predictors), tuple(available_burnout))
+
+
+@graph.node("scatter_rows")
+def compute_scatter_rows():
+    return scatter_sample(get_dataset_key(), df)
+
+
+def build_personality(regressions, scatter_rows):
+    fig, axes = plt.subplots(1, len(valid_pairs), figsize=(len(valid_pairs) * 5.5, 4.8))
+    if len(valid_pairs) == 1:
+        axes = [axes]
+
+    for ax, (pred, outcome, title) in zip(axes, valid_pairs):
+        plot_regression(
+            ax, df[pred].to_numpy()[scatter_rows], df[outcome].to_numpy()[scatter_rows],
+            regressions[(pred, outcome)], scatter_color="#9b59b6", line_color="#e74c3c",
+        )
+        ax.set_title(title, fontsize=11)
+        ax.set_xlabel(pred)
+        ax.set_ylabel(burnout_labels[outcome])
+        ax.grid(axis="both", linestyle="--", alpha=0.3)
+
+    fig.tight_layout()
+    return fig
+
+
+def build_predictor(selected_predictor, regressions, scatter_rows):
+    predictor_code, _ = predictor_options[selected_predictor]
+    fig, axes = plt.subplots(1, len(available_burnout), figsize=(len(available_burnout) * 5.5, 4.8))
+    if len(available_burnout) == 1:
+        axes = [axes]
+
+    colors_map = {"EE": "#e74c3c", "DP": "#e67e22", "PA": "#3498db"}
+
+    for ax, outcome in zip(axes, available_burnout):
+        plot_regression(
+            ax, df[predictor_code].to_numpy()[scatter_rows], df[outcome].to_numpy()[scatter_rows],
+            regressions[(predictor_code, outcome)], scatter_color=colors_map[outcome], line_color="#2c3e50",
+        )
+        ax.set_title(f"{burnout_labels[outcome]} vs {selected_predictor}", fontsize=11)
+        ax.set_xlabel(selected_predictor)
+        ax.set_ylabel(burnout_labels[outcome])
+        ax.grid(axis="both", linestyle="--", alpha=0.3)
+
+    fig.tight_layout()
+    return fig
+
+
+@graph.node("predictor_figure", "predictor", "regressions", "scatter_rows")
+def render_predictor(selected_predictor, regressions, scatter_rows):
+    if predictor_options[selected_predictor][0] == "personality":
+        return render_figure(
+            "insights.personality", lambda: build_personality(regressions, scatter_rows), tuple(valid_pairs)
+        )
+    return render_figure(
+        "insights.predictor",
+        lambda: build_predictor(selected_predictor, regressions, scatter_rows),
+        selected_predictor,
+        tuple(available_burnout),
+    )
+
+
+@st.fragment
+@timed("insights.predictor_section")
+def predictor_section():
+    selected_predictor = st.selectbox(
+        "Select predictor to explore:",
+        list(predictor_options.keys()),
+        index=0
+    )
+    graph.set_input("predictor", selected_predictor)
+    predictor_code, interpretation = predictor_options[selected_predictor]
+
+    if predictor_code == "personality":
+        if valid_pairs:
+            show_image(graph.value("predictor_figure"))
             st.info(interpretation)
         else:
-            st.warning("Burnout dimension data not available.")
-    else:
+            st.warning("Required personality trait data not available.")
+    elif not schema.has(predictor_code):
+        # Single predictor vs all three burnout dimensions
         st.warning(f"{selected_predictor} data not available in the dataset.")
+    elif not available_burnout:
+        st.warning("Burnout dimension data not available.")
+    else:
+        show_image(graph.value("predictor_figure"))
+        st.info(interpretation)
+
+
+predictor_section()
 
 st.divider()
 
@@ -129,21 +180,83 @@ priority_cols = [
     "Age",
     "Gender_num",
 ]
-available = [c for c in priority_cols if c in df.columns]
-numeric_df = df[available].select_dtypes(include="number") if available else pd.DataFrame()
+available = [col for col in schema.available(priority_cols) if pd.api.types.is_numeric_dtype(df[col])]
+item_cols = [col for scale in schema.scales.values() for col in scale.items]
+
+
+@graph.node("correlations", "heat_columns", "method")
+def compute_correlations(heat_columns, method):
+    running = get_running_statistics()
+    if method == "Pearson" and running is not None and set(heat_columns) <= set(running.columns.columns):
+        # Wave store: pairwise sums are kept up to date as waves arrive.
+        return correlation_from_moments(running.columns.subset(heat_columns))
+    return correlation_matrix(get_dataset_key(), df, heat_columns, method.lower())
+
+
+@graph.node("heatmap_matrix", "correlations", "clustered")
+def order_correlations(matrix, clustered):
+    return matrix.reordered(cluster_order(matrix)) if clustered else matrix
 
-if numeric_df.shape[1] >= 2:
-    fig, ax = plt.subplots(figsize=(12, 7))
+
+def build_heatmap(matrix, mark_significant):
+    annotate = len(matrix.columns) <= 20
+    size = (12, 7) if annotate else (14, 12)
+    fig, ax = plt.subplots(figsize=size)
+    labels = matrix.frame("r").map(lambda r: f"{r:.2f}")
+    if mark_significant:
+        labels = labels + np.where(matrix.p < 0.05, "*", "")
     sns.heatmap(
-        numeric_df.corr(),
+        matrix.frame("r"),
         cmap="coolwarm",
-        annot=True,
-        fmt=".2f",
+        vmin=-1,
+        vmax=1,
+        annot=labels.to_numpy() if annotate else False,
+        fmt="",
         ax=ax,
         annot_kws={"fontsize": 7},
+        xticklabels=True,
+        yticklabels=True,
     )
-    ax.tick_params(labelsize=8)
+    ax.tick_params(labelsize=8 if annotate else 5)
     fig.tight_layout()
-    st.pyplot(fig, width='stretch')
-else:
-    st.info("Not enough numeric columns to compute correlations.")
+    return fig
+
+
+@graph.node("heatmap_figure", "heatmap_matrix", "mark_significant")
+def render_heatmap(matrix, mark_significant):
+    return render_figure(
+        "insights.heatmap",
+        lambda: build_heatmap(matrix, mark_significant),
+        matrix.columns,
+        matrix.method,
+        mark_significant,
+    )
+
+
+@st.fragment
+@timed("insights.heatmap_section")
+def heatmap_section():
+    heat_cols = st.columns(4)
+    variable_set = heat_cols[0].selectbox("Variables:", ["Scale scores", "All items"], index=0)
+    method = graph.set_input("method", heat_cols[1].selectbox("Method:", ["Pearson", "Spearman"], index=0))
+    graph.set_input("clustered", heat_cols[2].checkbox("Cluster similar variables", value=False))
+    graph.set_input("mark_significant", heat_cols[3].checkbox("Mark p < .05", value=False))
+    heat_columns = graph.set_input("heat_columns", tuple(available if variable_set == "Scale scores" else item_cols))
+
+    if len(heat_columns) < 2:
+        st.info("Not enough numeric columns to compute correlations.")
+        return
+
+    show_image(graph.value("heatmap_figure"))
+    matrix = graph.value("heatmap_matrix")
+    st.caption(
+        f"Pairwise-complete {method} correlations; N per pair ranges from "
+        f"{matrix.n[~np.eye(len(matrix.columns), dtype=bool)].min()} to {matrix.n.max()}."
+    )
+    with st.expander("Correlation pairs (r, N, p)"):
+        st.dataframe(matrix.pairs().round(4), hide_index=True)
+
+
+heatmap_section()
+
+debug_panel()
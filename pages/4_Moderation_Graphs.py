@@ -1,162 +1,208 @@
 import streamlit as st
-import seaborn as sns
-import matplotlib.pyplot as plt
-import pandas as pd
 import numpy as np
 
-from data_loader import get_dataset
+from data_loader import get_dataset, get_dataset_key, get_schema
+from computation import PageGraph
+from figure_cache import FigureBatch
+from figure_render import FigureSpec
+from instrumentation import debug_panel, timed
+from lazy_imports import lazy
+from moderation import (
+    interaction_inference,
+    johnson_neyman,
+    level_predictions,
+    moderation_fits,
+    simple_slope_table,
+)
+import plots
+from resampling import suggested_jobs
 
-try:
-    import statsmodels.formula.api as smf
-    _STATSMODELS_AVAILABLE = True
-except ImportError:
-    _STATSMODELS_AVAILABLE = False
+# Seaborn (for its palettes) loads on first use (or is warmed by app.py), not on page import.
+sns = lazy("seaborn")
 
 st.title("Moderation Graphs")
 
 try:
     df = get_dataset()
+    schema = get_schema()
 except FileNotFoundError:
     st.error("Packaged dataset missing. Please place 'Data_Sheet _Cleaned_Final.csv' beside app.py.")
     st.stop()
 
 st.divider()
 
-if not _STATSMODELS_AVAILABLE:
-    st.warning("Statsmodels is required for advanced interaction analysis. Please install it to view these visualizations.")
-    st.code("pip install statsmodels", language="bash")
-else:
-    # Define function to generate interaction plot
-    def plot_advanced_interaction(dv_name, iv1_name, iv2_name, df_data):
-        """
-        Generates an interaction plot for adaptability and moderators on burnout dimensions.
-        
-        Args:
-            dv_name (str): Dependent variable (e.g., 'EE', 'DP', 'PA')
-            iv1_name (str): First independent variable (e.g., 'ADT_c')
-            iv2_name (str): Second independent variable/moderator (e.g., 'HoursPerWeek_c')
-            df_data (pd.DataFrame): Original DataFrame containing the data
-        """
-        # Build formula for regression
-        controls = []
-        for ctrl in ['Age_c', 'WorkExperienceYears_c', 'Gender_num']:
-            if ctrl in df_data.columns and ctrl != iv2_name:
-                controls.append(ctrl)
-        
-        control_str = " + " + " + ".join(controls) if controls else ""
-        formula = f"{dv_name} ~ {iv1_name} * {iv2_name}{control_str}"
-        
-        try:
-            # Fit model
-            model = smf.ols(formula, data=df_data).fit()
-            
-            # Calculate levels for the moderator
-            iv2_mean = df_data[iv2_name].mean()
-            iv2_std = df_data[iv2_name].std()
-            
-            iv2_levels = {
-                'Low': iv2_mean - iv2_std,
-                'Mean': iv2_mean,
-                'High': iv2_mean + iv2_std
-            }
-            
-            # Create range for iv1
-            iv1_range = np.linspace(df_data[iv1_name].min(), df_data[iv1_name].max(), 100)
-            
-            # Prepare prediction data
-            plot_data = []
-            for label, iv2_val in iv2_levels.items():
-                predict_data = {
-                    iv1_name: iv1_range,
-                    iv2_name: iv2_val,
-                }
-                
-                # Add control variables at their means
-                for ctrl in controls:
-                    if ctrl == 'Gender_num':
-                        predict_data[ctrl] = df_data['Gender_num'].mode()[0] if 'Gender_num' in df_data.columns else 0.5
-                    else:
-                        predict_data[ctrl] = df_data[ctrl].mean()
-                
-                predict_df = pd.DataFrame(predict_data)
-                predicted_dv = model.predict(predict_df)
-                
-                for i, val in enumerate(iv1_range):
-                    plot_data.append({
-                        iv1_name: val,
-                        dv_name: predicted_dv.iloc[i],
-                        'Level': label
-                    })
-            
-            plot_df = pd.DataFrame(plot_data)
-            
-            # Create plot
-            fig, ax = plt.subplots(figsize=(8, 5))
-            sns.lineplot(
-                data=plot_df,
-                x=iv1_name,
-                y=dv_name,
-                hue='Level',
-                palette='viridis',
-                linewidth=2,
-                ax=ax
-            )
-            
-            # Create labels
-            iv1_label = iv1_name.replace('_c', '').replace('ADT', 'Adaptability')
-            iv2_label = (iv2_name.replace('_c', '')
-                        .replace('HoursPerWeek', 'Hours Per Week')
-                        .replace('WKL', 'Workload')
-                        .replace('AUT', 'Autonomy')
-                        .replace('POS', 'Perceived Organizational Support'))
-            dv_label = (dv_name.replace('EE', 'Emotional Exhaustion')
-                       .replace('DP', 'Depersonalisation')
-                       .replace('PA', 'Personal Accomplishment'))
-            
-            ax.set_title(f'{iv1_label} × {iv2_label} → {dv_label}', fontsize=12, fontweight='bold')
-            ax.set_xlabel(iv1_label)
-            ax.set_ylabel(dv_label)
-            ax.legend(title=iv2_label)
-            ax.grid(True, linestyle='--', alpha=0.4)
-            
-            return fig
-            
-        except Exception as e:
-            st.error(f"Error generating interaction plot: {str(e)}")
-            return None
-    
-    # Define interactions to plot
-    interactions = [
-        ("HoursPerWeek_c", "Hours Per Week"),
-        ("WKL_c", "Workload"),
-        ("AUT_c", "Autonomy"),
-        ("POS_c", "Perceived Organizational Support")
-    ]
-    
-    burnout_dims = [
-        ("EE", "Emotional Exhaustion"),
-        ("DP", "Depersonalisation"),
-        ("PA", "Personal Accomplishment")
-    ]
-    
+
+def axis_labels(fit):
+    iv1_label = fit.focal.replace('_c', '').replace('ADT', 'Adaptability')
+    iv2_label = (fit.moderator.replace('_c', '')
+                 .replace('HoursPerWeek', 'Hours Per Week')
+                 .replace('WKL', 'Workload')
+                 .replace('AUT', 'Autonomy')
+                 .replace('POS', 'Perceived Organizational Support'))
+    dv_label = (fit.dv.replace('EE', 'Emotional Exhaustion')
+                .replace('DP', 'Depersonalisation')
+                .replace('PA', 'Personal Accomplishment'))
+    return iv1_label, iv2_label, dv_label
+
+
+def interaction_spec(fit):
+    """Interaction plot of adaptability and the moderator on one burnout dimension."""
+    try:
+        iv1_range, predictions = level_predictions(fit)
+    except Exception as e:
+        st.error(f"Error generating interaction plot: {str(e)}")
+        return None
+
+    iv1_label, iv2_label, dv_label = axis_labels(fit)
+    return FigureSpec(
+        plots.prediction_lines,
+        (8, 5),
+        data={"x": iv1_range, "lines": [(label, *bands) for label, bands in predictions.items()]},
+        style={
+            "colors": list(sns.color_palette("viridis", len(predictions))),
+            "title": f"{iv1_label} × {iv2_label} → {dv_label}",
+            "xlabel": iv1_label,
+            "ylabel": dv_label,
+            "legend_title": iv2_label,
+        },
+    )
+
+
+def johnson_neyman_spec(fit, jn):
+    """Conditional slope of adaptability across the moderator with its 95% band and significant regions."""
+    iv1_label, iv2_label, dv_label = axis_labels(fit)
+    return FigureSpec(
+        plots.conditional_slope,
+        (8, 4),
+        data={
+            "moderator": jn.moderator,
+            "slope": jn.slope,
+            "lower": jn.lower,
+            "upper": jn.upper,
+            "regions": list(jn.regions),
+            "boundaries": list(jn.boundaries),
+        },
+        style={
+            "title": f"Slope of {iv1_label} on {dv_label} across {iv2_label}",
+            "xlabel": f"{iv2_label} (centred)",
+            "ylabel": f"Slope of {iv1_label}",
+        },
+    )
+
+
+def describe_regions(jn):
+    if not jn.regions:
+        return "The adaptability slope is not significant anywhere in the observed moderator range."
+    spans = ", ".join(f"{start:.2f} to {end:.2f}" for start, end in jn.regions)
+    return f"The adaptability slope is significant (p < .05) for moderator values from {spans}."
+
+
+# Define interactions to plot
+interactions = [
+    ("HoursPerWeek_c", "Hours Per Week"),
+    ("WKL_c", "Workload"),
+    ("AUT_c", "Autonomy"),
+    ("POS_c", "Perceived Organizational Support")
+]
+
+burnout_dims = [
+    ("EE", "Emotional Exhaustion"),
+    ("DP", "Depersonalisation"),
+    ("PA", "Personal Accomplishment")
+]
+
+available_dvs = tuple(schema.available([dv for dv, _ in burnout_dims]))
+
+# Computation nodes: fits -> Johnson–Neyman, fits -> resampling inference.
+# Each runs again only when the moderator (or its own controls) changes.
+graph = PageGraph("moderation")
+
+
+def usable(fit):
+    return fit.dof >= 1 and np.isfinite(fit.cov).all()
+
+
+@graph.node("fits", "moderator")
+def compute_fits(moderator_col):
+    # One shared design matrix and solve per moderator covers all three burnout dimensions
+    return moderation_fits(get_dataset_key(), df, moderator_col, available_dvs, schema.controls)
+
+
+@graph.node("johnson_neyman", "fits")
+def compute_johnson_neyman(fits):
+    return {dv: johnson_neyman(fit) for dv, fit in fits.items() if usable(fit)}
+
+
+@graph.node("inference", "moderator", "n_reps")
+def compute_inference(moderator_col, n_reps):
+    return interaction_inference(
+        get_dataset_key(),
+        df,
+        moderator_col,
+        available_dvs,
+        schema.controls,
+        n_reps=n_reps,
+        n_jobs=suggested_jobs(len(df)),
+    )
+
+
+@st.fragment
+@timed("moderation.inference_section")
+def inference_section():
+    if st.toggle("Resampling inference for the interaction term", value=False):
+        graph.set_input("n_reps", st.select_slider("Replicates", options=[1000, 2000, 5000, 10000], value=2000))
+        with st.spinner("Running bootstrap and permutation replicates..."):
+            inference = graph.value("inference")
+        st.dataframe(inference.round(3), hide_index=True)
+        st.caption(
+            "Percentile bootstrap intervals resample respondents; permutation p-values "
+            "permute residuals of the model without the interaction (Freedman–Lane). Fixed seed."
+        )
+
+
+@st.fragment
+@timed("moderation.moderation_section")
+def moderation_section():
     # Allow user to select which interaction to view
     selected_moderator = st.selectbox(
         "Select Moderator:",
         [label for _, label in interactions],
         index=0
     )
-    
+
     # Find the corresponding column name
     moderator_col = next(col for col, label in interactions if label == selected_moderator)
-    
-    if moderator_col in df.columns and "ADT_c" in df.columns:
-        # Create plots for all three burnout dimensions
+    graph.set_input("moderator", moderator_col)
+
+    if not (schema.has(moderator_col, "ADT_c") and available_dvs):
+        st.warning("Required variables not available for interaction analysis.")
+        return
+
+    fits = graph.value("fits")
+    inference_section()
+
+    regions = graph.value("johnson_neyman")
+    # All of the moderator's figures render in parallel, each shown as it finishes.
+    with FigureBatch() as figures:
         for dv_col, dv_label in burnout_dims:
-            if dv_col in df.columns:
+            if dv_col in fits:
                 st.markdown(f"**{dv_label}**")
-                fig = plot_advanced_interaction(dv_col, "ADT_c", moderator_col, df)
-                if fig is not None:
-                    st.pyplot(fig, width='stretch')
-    else:
-        st.warning("Required variables not available for interaction analysis.")
+                fit = fits[dv_col]
+                if not usable(fit):
+                    st.info(f"Too few respondents in the current selection to fit this model (n = {fit.n}).")
+                    continue
+                figures.show("moderation.interaction", lambda fit=fit: interaction_spec(fit), dv_col, fit.moderator)
+                with st.expander("Simple slopes and Johnson–Neyman regions"):
+                    st.dataframe(simple_slope_table(fit).round(3), hide_index=True)
+                    figures.show(
+                        "moderation.johnson_neyman",
+                        lambda fit=fit, jn=regions[dv_col]: johnson_neyman_spec(fit, jn),
+                        dv_col,
+                        fit.moderator,
+                    )
+                    st.caption(describe_regions(regions[dv_col]))
+
+
+moderation_section()
 
+debug_panel()
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+
+# Drawing functions for ``FigureSpec``: each fills a fresh ``Figure`` through
+# the object-oriented API only, so figures can be drawn concurrently on the
+# render pool's threads. Keep this module free of Streamlit and pyplot.
+
+
+def distribution_bars(ax, edges, counts, support, density, color) -> None:
+    """Draw a precomputed distribution summary the way ``sns.histplot(kde=True)`` would."""
+    from matplotlib.colors import to_rgba
+
+    if len(counts) == 0:
+        return
+    ax.bar(
+        edges[:-1],
+        counts,
+        width=np.diff(edges),
+        align="edge",
+        color=to_rgba(color, 0.5),
+        edgecolor="black",
+        linewidth=1.0,
+    )
+    ax.plot(support, density, color=color, linewidth=1.5)
+
+
+def distribution(
+    fig,
+    edges,
+    counts,
+    support,
+    density,
+    color,
+    title: str,
+    title_size: float = 9,
+    xlabel: str = "",
+    ylabel: str = "",
+    grid_alpha: float = 0.4,
+) -> None:
+    ax = fig.subplots()
+    distribution_bars(ax, edges, counts, support, density, color)
+    ax.set_title(title, fontsize=title_size)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid(axis="y", linestyle="--", alpha=grid_alpha)
+    fig.tight_layout()
+
+
+def comparison_bars(fig, labels: Sequence[str], means, sds, colors, title: str, xlabel: str, ylabel: str) -> None:
+    ax = fig.subplots()
+    x_pos = np.arange(len(labels))
+    ax.bar(x_pos, means, yerr=sds, capsize=8, alpha=0.8, color=colors)
+    ax.set_xlabel(xlabel, fontsize=12)
+    ax.set_ylabel(ylabel, fontsize=12)
+    ax.set_title(title, fontsize=14)
+    ax.set_xticks(x_pos)
+    ax.set_xticklabels(labels)
+    ax.grid(axis="y", linestyle="--", alpha=0.3)
+    fig.tight_layout()
+
+
+def grouped_bars(
+    fig,
+    categories: Sequence[str],
+    groups: Sequence[str],
+    panels: Sequence[tuple[str, np.ndarray, np.ndarray]],
+    suptitle: str,
+    xlabel: str,
+) -> None:
+    """One panel per ``(label, means, errors)``, each a ``groups`` x ``categories`` array of bars."""
+    from matplotlib import colormaps
+
+    axes = fig.subplots(1, len(panels), squeeze=False)[0]
+    x_positions = np.arange(len(categories))
+    width = 0.7 / len(groups)
+    palette = ["#3498db", "#e74c3c"] if len(groups) == 2 else colormaps["coolwarm"](np.linspace(0.1, 0.9, len(groups)))
+
+    for ax, (label, means, errors) in zip(axes, panels):
+        for g, (group, color) in enumerate(zip(groups, palette)):
+            offset = (g - (len(groups) - 1) / 2) * width
+            ax.bar(x_positions + offset, means[g], width, yerr=errors[g], capsize=3, label=group,
+                   color=color, alpha=0.8, edgecolor="black", linewidth=0.8)
+
+        ax.set_xlabel(xlabel, fontsize=11)
+        ax.set_ylabel(f"Mean {label}", fontsize=11)
+        ax.set_title(label, fontsize=12, fontweight="bold")
+        ax.set_xticks(x_positions)
+        ax.set_xticklabels(categories, fontsize=9)
+        ax.legend(fontsize=9)
+        ax.grid(axis="y", linestyle="--", alpha=0.3)
+
+    fig.suptitle(suptitle, fontsize=14, fontweight="bold", y=1.02)
+    fig.tight_layout()
+
+
+def prediction_lines(
+    fig,
+    x,
+    lines: Sequence[tuple[str, np.ndarray, np.ndarray, np.ndarray]],
+    colors,
+    title: str,
+    xlabel: str,
+    ylabel: str,
+    legend_title: str,
+) -> None:
+    """One line per ``(label, predicted, lower, upper)`` with its shaded confidence band."""
+    ax = fig.subplots()
+    for (label, predicted, lower, upper), color in zip(lines, colors):
+        ax.plot(x, predicted, color=color, linewidth=2, label=label)
+        ax.fill_between(x, lower, upper, color=color, alpha=0.15, linewidth=0)
+
+    ax.set_title(title, fontsize=12, fontweight="bold")
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.legend(title=legend_title)
+    ax.grid(True, linestyle="--", alpha=0.4)
+
+
+def conditional_slope(
+    fig, moderator, slope, lower, upper, regions, boundaries, title: str, xlabel: str, ylabel: str
+) -> None:
+    """Conditional slope across the moderator with its 95% band, significant regions and boundaries."""
+    ax = fig.subplots()
+    for start, end in regions:
+        ax.axvspan(start, end, color="#2ecc71", alpha=0.12, linewidth=0)
+    ax.fill_between(moderator, lower, upper, color="#2c3e50", alpha=0.15, linewidth=0)
+    ax.plot(moderator, slope, color="#2c3e50", linewidth=2)
+    ax.axhline(0, color="black", linewidth=0.8)
+    for boundary in boundaries:
+        if moderator[0] <= boundary <= moderator[-1]:
+            ax.axvline(boundary, color="#e74c3c", linestyle="--", linewidth=1)
+
+    ax.set_title(title, fontsize=11)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid(True, linestyle="--", alpha=0.4)
+    fig.tight_layout()
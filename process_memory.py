@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from collections import deque
+import os
+import threading
+import time
+from typing import Optional
+import uuid
+
+import pandas as pd
+import streamlit as st
+
+try:
+    import psutil
+    _PSUTIL_AVAILABLE = True
+except ImportError:
+    _PSUTIL_AVAILABLE = False
+
+# A session that has not rerun for this long no longer counts as connected.
+SESSION_TIMEOUT_S = 30 * 60
+MAX_SAMPLES = 500
+
+
+def current_rss(pid: Optional[int] = None) -> Optional[int]:
+    """Resident set size of this process (or ``pid``) in bytes, or None where it cannot be read."""
+    if _PSUTIL_AVAILABLE:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class SessionRegistry:
+    """Process-wide record of recently active sessions and RSS samples taken as they rerun."""
+
+    def __init__(self) -> None:
+        self._last_seen: dict[str, float] = {}
+        self._samples: deque[tuple[float, int, Optional[int]]] = deque(maxlen=MAX_SAMPLES)
+        self._lock = threading.Lock()
+
+    def touch(self, session_id: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._last_seen[session_id] = now
+            for sid, seen in list(self._last_seen.items()):
+                if now - seen > SESSION_TIMEOUT_S:
+                    del self._last_seen[sid]
+            self._samples.append((now, len(self._last_seen), current_rss()))
+
+    @property
+    def active(self) -> int:
+        with self._lock:
+            return len(self._last_seen)
+
+    def samples(self) -> pd.DataFrame:
+        with self._lock:
+            rows = list(self._samples)
+        frame = pd.DataFrame(rows, columns=["time", "sessions", "rss_bytes"])
+        frame["time"] = pd.to_datetime(frame["time"], unit="s")
+        return frame
+
+
+@st.cache_resource
+def get_session_registry() -> SessionRegistry:
+    return SessionRegistry()
+
+
+def record_session() -> None:
+    session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+    get_session_registry().touch(session_id)
+
+
+def rss_by_sessions() -> pd.DataFrame:
+    """Peak RSS (MiB) observed at each number of concurrently active sessions."""
+    samples = get_session_registry().samples().dropna(subset=["rss_bytes"])
+    if samples.empty:
+        return pd.DataFrame(columns=["sessions", "rss_mib"])
+    peak = samples.groupby("sessions", as_index=False)["rss_bytes"].max()
+    peak["rss_mib"] = peak.pop("rss_bytes") / 2 ** 20
+    return peak
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import math
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from instrumentation import cached
+from lazy_imports import is_available, lazy
+
+_SCIPY_AVAILABLE = is_available("scipy")
+_scipy_stats = lazy("scipy.stats")
+
+LINE_POINTS = 100
+MAX_SCATTER_POINTS = 2_000
+SCATTER_SEED = 0
+
+
+def t_critical(dof, level: float = 0.95):
+    """Two-sided Student t critical value; falls back to the normal quantile without scipy."""
+    if _SCIPY_AVAILABLE:
+        return _scipy_stats.t.ppf(0.5 + level / 2, dof)
+    return np.full(np.shape(dof), 1.959963984540054) if np.ndim(dof) else 1.959963984540054
+
+
+def t_pvalue(t, dof):
+    """Two-sided p-value of Student t statistics; normal approximation without scipy."""
+    if _SCIPY_AVAILABLE:
+        return 2 * _scipy_stats.t.sf(np.abs(t), dof)
+    return np.vectorize(math.erfc)(np.abs(t) / math.sqrt(2))
+
+
+@dataclass(frozen=True)
+class RegressionSummary:
+    n: int
+    slope: float
+    intercept: float
+    x: np.ndarray
+    fit: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+
+
+def _masked(df: pd.DataFrame, columns: Iterable[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    values = df[list(columns)].to_numpy(dtype="float64", na_value=np.nan)
+    mask = ~np.isnan(values)
+    # Centring by the column mean (the loader's *_c columns) keeps the
+    # sums of squares below well conditioned.
+    means = np.nanmean(values, axis=0)
+    return np.where(mask, values - means, 0.0), mask, means
+
+
+def pairwise_ols(
+    df: pd.DataFrame, predictors: Iterable[str], outcomes: Iterable[str], level: float = 0.95
+) -> Dict[tuple[str, str], RegressionSummary]:
+    """Simple OLS of every outcome on every predictor over pairwise-complete rows."""
+    predictors, outcomes = list(predictors), list(outcomes)
+    x, mx, x_mean = _masked(df, predictors)
+    y, my, y_mean = _masked(df, outcomes)
+    mxf, myf = mx.astype(np.float64), my.astype(np.float64)
+
+    # Every sufficient statistic for all (predictor, outcome) pairs at once;
+    # zeros at missing cells drop those rows from each pair's sums.
+    n = mxf.T @ myf
+    sx = x.T @ myf
+    sy = mxf.T @ y
+    sxx = (x * x).T @ myf
+    syy = mxf.T @ (y * y)
+    sxy = x.T @ y
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        xbar, ybar = sx / n, sy / n
+        cxx = sxx - sx * xbar
+        cyy = syy - sy * ybar
+        cxy = sxy - sx * ybar
+        slope = cxy / cxx
+        sigma2 = (cyy - slope * cxy) / (n - 2)
+        crit = t_critical(np.maximum(n - 2, 1), level)
+
+    lows = np.where(mx, x, np.inf).min(axis=0) + x_mean
+    highs = np.where(mx, x, -np.inf).max(axis=0) + x_mean
+
+    summaries: Dict[tuple[str, str], RegressionSummary] = {}
+    for i, pred in enumerate(predictors):
+        grid = np.linspace(lows[i], highs[i], LINE_POINTS)
+        offset = grid - x_mean[i]
+        for j, outcome in enumerate(outcomes):
+            fit = y_mean[j] + ybar[i, j] + slope[i, j] * (offset - xbar[i, j])
+            with np.errstate(invalid="ignore"):
+                se = np.sqrt(sigma2[i, j] * (1 / n[i, j] + (offset - xbar[i, j]) ** 2 / cxx[i, j]))
+            half = crit[i, j] * se
+            summaries[(pred, outcome)] = RegressionSummary(
+                n=int(n[i, j]),
+                slope=float(slope[i, j]),
+                intercept=float(y_mean[j] + ybar[i, j] - slope[i, j] * (x_mean[i] + xbar[i, j])),
+                x=grid,
+                fit=fit,
+                lower=fit - half,
+                upper=fit + half,
+            )
+    return summaries
+
+
+@cached("regression.summaries", st.cache_data(show_spinner=False))
+def regression_summaries(
+    dataset_key: str, _df: pd.DataFrame, predictors: tuple[str, ...], outcomes: tuple[str, ...]
+) -> Dict[tuple[str, str], RegressionSummary]:
+    return pairwise_ols(_df, predictors, outcomes)
+
+
+@cached("regression.scatter_sample", st.cache_data(show_spinner=False))
+def scatter_sample(dataset_key: str, _df: pd.DataFrame, max_points: int = MAX_SCATTER_POINTS) -> np.ndarray:
+    """Row positions to draw in scatter plots; all rows when the dataset is small."""
+    if len(_df) <= max_points:
+        return np.arange(len(_df))
+    rng = np.random.default_rng(SCATTER_SEED)
+    return np.sort(rng.choice(len(_df), size=max_points, replace=False))
+
+
+def plot_regression(ax, x: np.ndarray, y: np.ndarray, summary: RegressionSummary, scatter_color, line_color) -> None:
+    """Scatter plus precomputed fit and band, styled like ``sns.regplot``."""
+    ax.scatter(x, y, alpha=0.5, color=scatter_color, s=50)
+    ax.plot(summary.x, summary.fit, color=line_color, linewidth=2)
+    ax.fill_between(summary.x, summary.lower, summary.upper, color=line_color, alpha=0.15, linewidth=0)
+
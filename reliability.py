@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from instrumentation import cached
+from moments import PairwiseMoments
+from resampling import DEFAULT_SEED, bootstrap_count_chunks, percentile_interval, replicate_blocks, run_blocks
+from schema import DatasetSchema
+
+# Datasets up to this many rows get bootstrap intervals on first render;
+# larger ones compute them on request.
+BOOTSTRAP_AUTO_ROWS = 20_000
+
+
+def covariance_statistics(cov: np.ndarray) -> Dict[str, object]:
+    """Reliability statistics for one scale derived from its item covariance matrix."""
+    k = cov.shape[0]
+    item_vars = np.diag(cov)
+    total_var = cov.sum()
+    row_sums = cov.sum(axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        alpha = k / (k - 1) * (1 - item_vars.sum() / total_var) if total_var > 0 else np.nan
+
+        sd = np.sqrt(item_vars)
+        corr = cov / np.outer(sd, sd)
+        mean_r = (corr.sum() - np.trace(corr)) / (k * (k - 1))
+        standardized = k * mean_r / (1 + (k - 1) * mean_r)
+
+        # Dropping item i removes its row and column from the covariance sum;
+        # every deletion is derived from the same matrix instead of refitting.
+        rest_var = total_var - 2 * row_sums + item_vars
+        if k > 2:
+            alpha_if_deleted = (k - 1) / (k - 2) * (1 - (item_vars.sum() - item_vars) / rest_var)
+        else:
+            alpha_if_deleted = np.full(k, np.nan)
+        item_total_r = (row_sums - item_vars) / np.sqrt(item_vars * rest_var)
+
+    return {
+        "alpha": float(alpha),
+        "standardized_alpha": float(standardized),
+        "alpha_if_deleted": alpha_if_deleted,
+        "item_total_r": item_total_r,
+    }
+
+
+def _item_values(df: pd.DataFrame, positions: tuple[int, ...]) -> np.ndarray:
+    return df.iloc[:, list(positions)].to_numpy(dtype="float64", na_value=np.nan)
+
+
+def _reliability_frames(
+    schema: DatasetSchema, covariances: Dict[str, tuple[int, Optional[np.ndarray]]]
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    # ``covariances`` maps each scale to its complete-case N and item covariance.
+    scale_rows = []
+    item_rows = []
+    for scale in schema.scales.values():
+        if scale.prefix not in covariances:
+            continue
+        n, cov = covariances[scale.prefix]
+        stats = covariance_statistics(cov) if cov is not None else None
+        scale_rows.append({
+            "Scale": scale.label,
+            "Prefix": scale.prefix,
+            "Items": len(scale.items),
+            "N": n,
+            "alpha": stats["alpha"] if stats else np.nan,
+            "standardized_alpha": stats["standardized_alpha"] if stats else np.nan,
+        })
+        for idx, item in enumerate(scale.items):
+            item_rows.append({
+                "Scale": scale.label,
+                "Item": item,
+                "alpha_if_deleted": stats["alpha_if_deleted"][idx] if stats else np.nan,
+                "item_total_r": stats["item_total_r"][idx] if stats else np.nan,
+            })
+    return pd.DataFrame(scale_rows), pd.DataFrame(item_rows)
+
+
+@cached("reliability.tables", st.cache_data(show_spinner=False))
+def reliability_tables(
+    dataset_key: str, _df: pd.DataFrame, _schema: DatasetSchema
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Scale-level and item-level reliability for every scale with two or more items."""
+    covariances: Dict[str, tuple[int, Optional[np.ndarray]]] = {}
+    for scale in _schema.scales.values():
+        if len(scale.items) < 2:
+            continue
+        values = _item_values(_df, scale.item_positions)
+        values = values[~np.isnan(values).any(axis=1)]
+        n = values.shape[0]
+        covariances[scale.prefix] = (n, np.cov(values, rowvar=False) if n >= 2 else None)
+    return _reliability_frames(_schema, covariances)
+
+
+def reliability_from_moments(
+    schema: DatasetSchema, scales: Dict[str, PairwiseMoments]
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """``reliability_tables`` from running item moments, without touching the rows."""
+    covariances: Dict[str, tuple[int, Optional[np.ndarray]]] = {}
+    for scale in schema.scales.values():
+        if len(scale.items) < 2:
+            continue
+        moments = scales.get(scale.prefix)
+        if moments is None or not set(scale.items) <= set(moments.columns):
+            covariances[scale.prefix] = (0, None)
+            continue
+        moments = moments.subset(scale.items)
+        n = int(moments.n.min())
+        covariances[scale.prefix] = (n, moments.covariance() if n >= 2 else None)
+    return _reliability_frames(schema, covariances)
+
+
+def _moment_columns(
+    item_sets: list[tuple[np.ndarray, np.ndarray]], mean_values: np.ndarray, mean_present: np.ndarray, rows: slice
+) -> np.ndarray:
+    # Per scale: complete-row indicator, items, squared row total and row sum
+    # of squares (items are zero on incomplete rows); then the mean scores
+    # and their presence. Alpha needs only their weighted sums.
+    columns = []
+    for complete, values in item_sets:
+        x = values[rows]
+        total = x.sum(axis=1)
+        columns += [complete[rows, None], x, (total * total)[:, None], np.einsum("ij,ij->i", x, x)[:, None]]
+    columns += [mean_values[rows], mean_present[rows]]
+    return np.hstack(columns, dtype=np.float64)
+
+
+def _bootstrap_block(
+    shared: tuple[list[tuple[np.ndarray, np.ndarray]], np.ndarray, np.ndarray],
+    size: int,
+    seed: np.random.SeedSequence,
+) -> tuple[np.ndarray, np.ndarray]:
+    item_sets, mean_values, mean_present = shared
+    n_rows, n_scales = mean_values.shape
+
+    # Weighted sums for every replicate: one (B x chunk) @ (chunk x columns)
+    # product per chunk of resample counts.
+    sums = None
+    for rows, counts in bootstrap_count_chunks(np.random.default_rng(seed), n_rows, size):
+        block = counts @ _moment_columns(item_sets, mean_values, mean_present, rows)
+        sums = block if sums is None else sums + block
+
+    alphas = np.empty((size, n_scales))
+    start = 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for col, (_, values) in enumerate(item_sets):
+            k = values.shape[1]
+            n = sums[:, start]
+            s1 = sums[:, start + 1 : start + 1 + k]
+            squared_totals, squares = sums[:, start + 1 + k], sums[:, start + 2 + k]
+            # Item variances and total-score variance, both scaled by (n - 1).
+            item_vars = squares - (s1 * s1).sum(axis=1) / n
+            total_var = squared_totals - s1.sum(axis=1) ** 2 / n
+            alphas[:, col] = np.where(total_var > 0, k / (k - 1) * (1 - item_vars / total_var), np.nan)
+            start += k + 3
+        boot_means = sums[:, start : start + n_scales] / sums[:, start + n_scales :]
+    return alphas, boot_means
+
+
+@cached("reliability.bootstrap", st.cache_data(show_spinner=False))
+def bootstrap_reliability(
+    dataset_key: str,
+    _df: pd.DataFrame,
+    _schema: DatasetSchema,
+    n_boot: int = 1000,
+    seed: int = DEFAULT_SEED,
+    n_jobs: Optional[int] = 1,
+    level: float = 0.95,
+) -> pd.DataFrame:
+    """Percentile bootstrap intervals for each scale's alpha and mean score."""
+    scales = [s for s in _schema.scales.values() if len(s.items) >= 2 and s.mean is not None]
+    if not scales or _df.empty:
+        return pd.DataFrame(columns=["Prefix", "alpha_low", "alpha_high", "mean", "mean_low", "mean_high"])
+
+    item_sets = []
+    for scale in scales:
+        values = _item_values(_df, scale.item_positions)
+        complete = ~np.isnan(values).any(axis=1)
+        # Centring on the complete-case means keeps the replicate sums well
+        # conditioned; covariances do not change.
+        center = values[complete].mean(axis=0) if complete.any() else np.zeros(values.shape[1])
+        item_sets.append((complete, np.where(complete[:, None], values - center, 0.0)))
+    means = _df[[s.mean for s in scales]].to_numpy(dtype="float64", na_value=np.nan)
+    present = ~np.isnan(means)
+    shared = (item_sets, np.where(present, means, 0.0), present.astype(np.float64))
+    tasks = [(size, child) for size, child in replicate_blocks(n_boot, seed)]
+    blocks = run_blocks(_bootstrap_block, tasks, n_jobs, shared=shared)
+
+    alphas = np.vstack([a for a, _ in blocks])
+    boot_means = np.vstack([m for _, m in blocks])
+    alpha_low, alpha_high = percentile_interval(alphas, level)
+    mean_low, mean_high = percentile_interval(boot_means, level)
+    return pd.DataFrame({
+        "Prefix": [s.prefix for s in scales],
+        "alpha_low": alpha_low,
+        "alpha_high": alpha_high,
+        "mean": np.nanmean(means, axis=0),
+        "mean_low": mean_low,
+        "mean_high": mean_high,
+    })
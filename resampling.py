@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+from typing import Callable, Iterator, Optional, Sequence, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+DEFAULT_SEED = 20240601
+BLOCK_SIZE = 250
+# Below this many rows a block is too short for a pool to pay off.
+PARALLEL_MIN_ROWS = 50_000
+# Resample counts are drawn this many rows at a time, so a block holds
+# replicates x COUNT_CHUNK_ROWS counts whatever the number of respondents.
+COUNT_CHUNK_ROWS = 8192
+# Replicates x rows values (permutation orders, resampled outcomes) a block
+# holds at once; larger blocks are worked through in sub-blocks.
+MAX_BLOCK_ELEMENTS = BLOCK_SIZE * COUNT_CHUNK_ROWS
+
+
+def replicate_blocks(n_reps: int, seed: int, block_size: int = BLOCK_SIZE) -> list[tuple[int, np.random.SeedSequence]]:
+    """Split ``n_reps`` replicates into fixed blocks, each with its own child seed.
+
+    Blocks and seeds depend only on ``n_reps``, ``seed`` and ``block_size``, so
+    results are identical whether blocks run serially or in a pool.
+    """
+    sizes = [block_size] * (n_reps // block_size)
+    if n_reps % block_size:
+        sizes.append(n_reps % block_size)
+    children = np.random.SeedSequence(seed).spawn(len(sizes))
+    return list(zip(sizes, children))
+
+
+def bootstrap_count_chunks(
+    rng: np.random.Generator, n_rows: int, n_reps: int, chunk_rows: int = COUNT_CHUNK_ROWS
+) -> Iterator[tuple[slice, np.ndarray]]:
+    """Resample counts for ``n_reps`` replicates, ``chunk_rows`` rows at a time.
+
+    Each replicate draws ``n_rows`` rows with replacement. A chunk's share of
+    the draws still to place is binomial, and that share is spread uniformly
+    over the chunk's rows, so the chunks together are an exact resample.
+    """
+    remaining = np.full(n_reps, n_rows, dtype=np.int64)
+    for start in range(0, n_rows, chunk_rows):
+        stop = min(start + chunk_rows, n_rows)
+        m = stop - start
+        drawn = rng.binomial(remaining, m / (n_rows - start)) if stop < n_rows else remaining
+        remaining = remaining - drawn
+        idx = rng.integers(0, m, size=int(drawn.sum()))
+        idx += np.repeat(np.arange(n_reps) * m, drawn)
+        counts = np.bincount(idx, minlength=n_reps * m).reshape(n_reps, m).astype(np.float64)
+        yield slice(start, stop), counts
+
+
+def suggested_jobs(n_rows: int) -> int:
+    if n_rows < PARALLEL_MIN_ROWS:
+        return 1
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def run_blocks(
+    fn: Callable[..., T], tasks: Sequence[tuple], n_jobs: Optional[int] = 1, shared: object = None
+) -> list[T]:
+    """Run ``fn(*task)`` for every task, on a thread pool when ``n_jobs`` > 1.
+
+    Data every task reads goes in ``shared`` and reaches ``fn`` as its first
+    argument (``fn(shared, *task)``); threads read it in place. Blocks spend
+    their time in NumPy products that release the GIL, and unlike forked
+    workers, threads cannot inherit a lock another server thread (e.g. the
+    import warmer) was holding.
+    """
+    def call(task: tuple) -> T:
+        return fn(*task) if shared is None else fn(shared, *task)
+
+    n_jobs = n_jobs or 1
+    if n_jobs <= 1 or len(tasks) <= 1:
+        return [call(task) for task in tasks]
+    with ThreadPoolExecutor(max_workers=min(n_jobs, len(tasks)), thread_name_prefix="resampling") as pool:
+        return list(pool.map(call, tasks))
+
+
+def percentile_interval(replicates: np.ndarray, level: float = 0.95) -> tuple[np.ndarray, np.ndarray]:
+    tail = (1 - level) / 2 * 100
+    low, high = np.nanpercentile(replicates, [tail, 100 - tail], axis=0)
+    return low, high
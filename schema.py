@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import re
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+SCALE_LABELS: Dict[str, str] = {
+    "ADT": "Adaptability",
+    "EXT": "Extraversion",
+    "AGR": "Agreeableness",
+    "CST": "Conscientiousness",
+    "NEU": "Neuroticism",
+    "OPE": "Openness",
+    "EE": "Emotional Exhaustion",
+    "DP": "Depersonalisation",
+    "PA": "Personal Accomplishment",
+    "AUT": "Autonomy",
+    "WKL": "Workload",
+    "POS": "Perceived Organizational Support",
+}
+
+SCALE_PREFIXES = list(SCALE_LABELS)
+
+DEMOGRAPHIC_COLUMNS: Dict[str, str] = {
+    "gender_num": "Gender_num",
+    "age": "Age",
+    "hours": "HoursPerWeek",
+    "experience": "ExperienceYears",
+    "work_experience": "WorkExperienceYears",
+}
+
+CONTROL_COLUMNS = ["Age_c", "WorkExperienceYears_c", "Gender_num"]
+
+CENTERED_SUFFIX = "_c"
+
+_LEADING_ALPHA = re.compile(r"[A-Za-z]+")
+_PREFIX_LOOKUP = {prefix.upper(): prefix for prefix in SCALE_PREFIXES}
+
+
+def _item_prefix(column: str) -> Optional[str]:
+    # Items are named <PREFIX><n>[_R]; matching on the leading letters is a
+    # single dict lookup per column instead of a startswith scan per prefix.
+    if column.endswith(CENTERED_SUFFIX):
+        return None
+    match = _LEADING_ALPHA.match(column)
+    if match is None or match.group() == column:
+        return None
+    return _PREFIX_LOOKUP.get(match.group().upper())
+
+
+def detect_source_roles(columns: Iterable[str]) -> Dict[str, object]:
+    """Classify cleaned source columns in one pass for the loader's encoders."""
+    roles: Dict[str, object] = {}
+    items: Dict[str, list[str]] = {}
+    for col in columns:
+        lower = col.lower()
+        prefix = _item_prefix(col)
+        if prefix is not None:
+            items.setdefault(prefix, []).append(col)
+        elif "gender" in lower:
+            roles.setdefault("gender", col)
+        elif lower.startswith("age"):
+            roles.setdefault("age", col)
+        elif "hours_per_week" in lower:
+            roles.setdefault("hours", col)
+        elif "experience" in lower and "year" in lower:
+            roles.setdefault("experience", col)
+    roles["items"] = items
+    return roles
+
+
+@dataclass(frozen=True)
+class ScaleColumns:
+    prefix: str
+    label: str
+    items: tuple[str, ...]
+    item_positions: tuple[int, ...]
+    mean: Optional[str] = None
+    centered: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class DatasetSchema:
+    scales: Dict[str, ScaleColumns]
+    demographics: Dict[str, str]
+    controls: tuple[str, ...]
+    positions: Dict[str, int] = field(repr=False)
+
+    def has(self, *columns: str) -> bool:
+        return all(col in self.positions for col in columns)
+
+    def available(self, columns: Iterable[str]) -> list[str]:
+        return [col for col in columns if col in self.positions]
+
+    def items(self, prefix: str) -> tuple[str, ...]:
+        scale = self.scales.get(prefix)
+        return scale.items if scale is not None else ()
+
+    def centered(self, column: str) -> Optional[str]:
+        name = f"{column}{CENTERED_SUFFIX}"
+        return name if name in self.positions else None
+
+
+def build_schema(df: pd.DataFrame) -> DatasetSchema:
+    positions = {col: idx for idx, col in enumerate(df.columns)}
+    items: Dict[str, list[str]] = {}
+    for col in df.columns:
+        prefix = _item_prefix(col)
+        if prefix is not None:
+            items.setdefault(prefix, []).append(col)
+
+    scales: Dict[str, ScaleColumns] = {}
+    for prefix in SCALE_PREFIXES:
+        scale_items = items.get(prefix, [])
+        mean = prefix if prefix in positions else None
+        if not scale_items and mean is None:
+            continue
+        centered = f"{prefix}{CENTERED_SUFFIX}"
+        scales[prefix] = ScaleColumns(
+            prefix=prefix,
+            label=SCALE_LABELS[prefix],
+            items=tuple(scale_items),
+            item_positions=tuple(positions[c] for c in scale_items),
+            mean=mean,
+            centered=centered if centered in positions else None,
+        )
+
+    return DatasetSchema(
+        scales=scales,
+        demographics={role: col for role, col in DEMOGRAPHIC_COLUMNS.items() if col in positions},
+        controls=tuple(col for col in CONTROL_COLUMNS if col in positions),
+        positions=positions,
+    )
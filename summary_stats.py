@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from filters import FilterIndex, Selection
+from instrumentation import cached, stage
+from schema import CENTERED_SUFFIX, DatasetSchema
+
+# Scale parameter of the quantile sketch: about COMPRESSION / 2 centroids per
+# column and cell, with the tails kept at single values. Cells of up to
+# COMPRESSION rows keep every value, so small datasets get exact quantiles.
+COMPRESSION = 200
+QUANTILES = (0.25, 0.5, 0.75)
+
+# Column roles in the order the Overview offers them.
+ROLES = ("Demographics", "Scale scores", "Scale items", "Centred copies", "Other")
+DEFAULT_ROLES = ("Demographics", "Scale scores")
+
+# Column sketches kept process-wide; enough for every column of a wide survey.
+MAX_SKETCHED_COLUMNS = 512
+
+
+@dataclass(frozen=True)
+class CellSketches:
+    """Mergeable summary of one column within every filter cell.
+
+    Per cell: the count, mean, sum of squared deviations, min and max, plus a
+    t-digest-style quantile sketch (``centroid_*``, grouped by cell). Any
+    union of cells, and so any filter selection, is summarised by merging its
+    cells' entries; two batches of rows over the same cells merge the same way.
+    """
+
+    count: np.ndarray
+    mean: np.ndarray
+    m2: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+    centroid_cell: np.ndarray
+    centroid_mean: np.ndarray
+    centroid_weight: np.ndarray
+
+    @classmethod
+    def from_values(cls, values: np.ndarray, cells: np.ndarray, n_cells: int) -> CellSketches:
+        """One pass over a column (NaN for missing) and each row's cell."""
+        observed = ~np.isnan(values)
+        values, cells = values[observed], cells[observed]
+        count = np.bincount(cells, minlength=n_cells).astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.bincount(cells, values, n_cells) / count
+        m2 = np.bincount(cells, (values - mean[cells]) ** 2, n_cells)
+        centroid_cell, centroid_mean, centroid_weight, lo, hi = _compress(
+            cells, values, np.ones_like(values), n_cells
+        )
+        return cls(count, mean, m2, lo, hi, centroid_cell, centroid_mean, centroid_weight)
+
+    def merge(self, other: CellSketches) -> CellSketches:
+        """Summaries of both batches' rows, cell by cell."""
+        count = self.count + other.count
+        with np.errstate(divide="ignore", invalid="ignore"):
+            delta = np.where((self.count > 0) & (other.count > 0), other.mean - self.mean, 0.0)
+            weight = np.where(count > 0, self.count * other.count / count, 0.0)
+            mean = np.where(
+                self.count == 0, other.mean, np.where(other.count == 0, self.mean, self.mean + delta * other.count / count)
+            )
+        centroid_cell, centroid_mean, centroid_weight, _, _ = _compress(
+            np.concatenate([self.centroid_cell, other.centroid_cell]),
+            np.concatenate([self.centroid_mean, other.centroid_mean]),
+            np.concatenate([self.centroid_weight, other.centroid_weight]),
+            len(count),
+        )
+        return CellSketches(
+            count=count,
+            mean=mean,
+            m2=self.m2 + other.m2 + delta * delta * weight,
+            min=np.fmin(self.min, other.min),
+            max=np.fmax(self.max, other.max),
+            centroid_cell=centroid_cell,
+            centroid_mean=centroid_mean,
+            centroid_weight=centroid_weight,
+        )
+
+    def describe(self, keep: np.ndarray) -> Dict[str, float]:
+        """``describe()``-style statistics over the cells where ``keep`` is true."""
+        keep = keep & (self.count > 0)
+        n = float(self.count[keep].sum())
+        if n == 0:
+            return {"count": 0.0, **{name: np.nan for name in _STATISTICS[1:]}}
+        counts, means = self.count[keep], self.mean[keep]
+        mean = float(counts @ means / n)
+        m2 = float(self.m2[keep].sum() + counts @ (means - mean) ** 2)
+        lo, hi = float(self.min[keep].min()), float(self.max[keep].max())
+
+        # A few hundred centroids per cell: sorting them beats re-compressing.
+        selected = keep[self.centroid_cell]
+        centroid_mean, centroid_weight = self.centroid_mean[selected], self.centroid_weight[selected]
+        order = np.argsort(centroid_mean, kind="stable")
+        quantiles = _quantiles(centroid_mean[order], centroid_weight[order], lo, hi)
+        return {
+            "count": n,
+            "mean": mean,
+            "std": float(np.sqrt(m2 / (n - 1))) if n > 1 else np.nan,
+            "min": lo,
+            **dict(zip(_STATISTICS[4:7], quantiles)),
+            "max": hi,
+        }
+
+
+_STATISTICS = ("count", "mean", "std", "min", *(f"{q:.0%}" for q in QUANTILES), "max")
+
+
+def _scale(q: np.ndarray) -> np.ndarray:
+    # t-digest's k1 scale: centroids shrink towards the tails of each cell.
+    return COMPRESSION / (2 * np.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1))
+
+
+def _compress(
+    cells: np.ndarray, means: np.ndarray, weights: np.ndarray, n_cells: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Merge weighted points into at most ~COMPRESSION / 2 centroids per cell, all cells at once.
+
+    Returns the centroids (cell, mean, weight), sorted by cell then mean, and
+    each cell's smallest and largest point.
+    """
+    order = np.lexsort((means, cells))
+    cells, means, weights = cells[order], means[order], weights[order]
+    total = np.bincount(cells, weights, n_cells)
+    before = np.cumsum(total) - total
+    with np.errstate(divide="ignore", invalid="ignore"):
+        q = (np.cumsum(weights) - weights / 2 - before[cells]) / total[cells]
+    groups = COMPRESSION // 2 + 3
+    key = cells * groups + (np.floor(_scale(q)).astype(np.int64) + COMPRESSION // 4 + 1)
+    # Negative keys are unique per point: small cells are kept uncompressed.
+    key = np.where(total[cells] <= COMPRESSION, -1 - np.arange(len(key)), key)
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]]) if len(key) else np.array([], dtype=np.int64)
+    weight = np.add.reduceat(weights, starts) if len(starts) else np.array([])
+    mean = np.add.reduceat(means * weights, starts) / weight if len(starts) else np.array([])
+
+    lo, hi = np.full(n_cells, np.nan), np.full(n_cells, np.nan)
+    if len(cells):
+        first = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+        last = np.r_[first[1:] - 1, len(cells) - 1]
+        lo[cells[first]], hi[cells[last]] = means[first], means[last]
+    return cells[starts], mean, weight, lo, hi
+
+
+def _quantiles(means: np.ndarray, weights: np.ndarray, lo: float, hi: float) -> list[float]:
+    """Interpolated quantiles from centroids sorted by mean.
+
+    Ranks use pandas' linear convention, so the result is exact while every
+    centroid still holds a single value.
+    """
+    n = weights.sum()
+    centers = np.cumsum(weights) - weights / 2
+    ranks = np.asarray(QUANTILES) * (n - 1) + 0.5
+    return list(np.interp(ranks, np.r_[0.0, centers, n], np.r_[lo, means, hi]))
+
+
+def column_roles(schema: DatasetSchema, df: pd.DataFrame) -> Dict[str, list[str]]:
+    """Numeric columns by role, in frame order; roles without columns are left out."""
+    scale_scores = {scale.mean for scale in schema.scales.values() if scale.mean}
+    items = {item for scale in schema.scales.values() for item in scale.items}
+    demographics = set(schema.demographics.values())
+    roles: Dict[str, list[str]] = {role: [] for role in ROLES}
+    for col in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[col]) or pd.api.types.is_bool_dtype(df[col]):
+            continue
+        if col in scale_scores:
+            roles["Scale scores"].append(col)
+        elif col in demographics:
+            roles["Demographics"].append(col)
+        elif col in items:
+            roles["Scale items"].append(col)
+        elif col.endswith(CENTERED_SUFFIX):
+            roles["Centred copies"].append(col)
+        else:
+            roles["Other"].append(col)
+    return {role: columns for role, columns in roles.items() if columns}
+
+
+def role_columns(roles: Dict[str, list[str]], chosen: Iterable[str]) -> list[str]:
+    chosen = set(chosen)
+    return [col for role, columns in roles.items() if role in chosen for col in columns]
+
+
+@cached("summary.cell_sketches", st.cache_resource(show_spinner=False, max_entries=MAX_SKETCHED_COLUMNS))
+def _cell_sketches(
+    fingerprint: str, column: str, _df: pd.DataFrame, _index: FilterIndex
+) -> tuple[np.ndarray, CellSketches]:
+    row_cells, cell_codes = _filter_cells(fingerprint, _index)
+    values = _df[column].to_numpy(dtype="float64", na_value=np.nan)
+    return cell_codes, CellSketches.from_values(values, row_cells, len(cell_codes))
+
+
+@cached("summary.filter_cells", st.cache_resource(show_spinner=False, max_entries=2))
+def _filter_cells(fingerprint: str, _index: FilterIndex) -> tuple[np.ndarray, np.ndarray]:
+    return _index.cells()
+
+
+@cached("summary.table", st.cache_data(show_spinner=False, max_entries=64))
+def summary_table(
+    dataset_key: str,
+    fingerprint: str,
+    columns: Sequence[str],
+    _df: pd.DataFrame,
+    _index: FilterIndex,
+    _selection: Selection,
+) -> pd.DataFrame:
+    """``df.describe().T`` of the selected rows, merged from per-cell sketches of the full dataset.
+
+    ``_df`` is the full (unfiltered) dataset and ``fingerprint`` its key.
+    Each column is read once per dataset; other filter selections and column
+    roles only merge the sketches already held.
+    """
+    rows = {}
+    for col in columns:
+        cell_codes, sketches = _cell_sketches(fingerprint, col, _df, _index)
+        with stage("summary.merge"):
+            rows[col] = sketches.describe(_index.select_cells(_selection, cell_codes))
+    return pd.DataFrame.from_dict(rows, orient="index", columns=list(_STATISTICS))
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import importlib
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_chunk
+from data_loader import _clean_chunk, _finalize
+from lazy_imports import HEAVY_MODULES, wait_until_warm, warm_in_background
+from moderation import interaction_resampling
+from reliability import bootstrap_reliability
+from resampling import run_blocks
+from schema import build_schema, detect_source_roles
+
+# Long enough for either computation on the small frame below; a deadlocked
+# pool never finishes at all.
+TIMEOUT_S = 120
+
+
+def _import_block(name: str) -> str:
+    return importlib.import_module(name).__name__
+
+
+@pytest.fixture(scope="module")
+def survey() -> tuple[pd.DataFrame, object]:
+    raw = generate_chunk(np.random.default_rng(0), 2000)
+    roles = detect_source_roles(raw.columns)
+    df = _finalize(_clean_chunk(raw, roles), roles)
+    return df, build_schema(df)
+
+
+def _within_timeout(fn, *args, **kwargs):
+    # A daemon thread, so a hung pool fails the test instead of the run.
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(value=fn(*args, **kwargs)), daemon=True)
+    worker.start()
+    worker.join(TIMEOUT_S)
+    assert not worker.is_alive(), f"{fn.__name__} did not finish within {TIMEOUT_S}s"
+    return result["value"]
+
+
+def test_run_blocks_importing_while_warming():
+    # First in the file: the warmer starts once per process, and the blocks
+    # import the very modules it is loading.
+    names = [name for name in HEAVY_MODULES if name not in sys.modules]
+    warm_in_background()
+    time.sleep(0.05)
+    tasks = [(name,) for name in names]
+    assert _within_timeout(run_blocks, _import_block, tasks, n_jobs=2) == names
+    assert wait_until_warm(TIMEOUT_S)
+
+
+def test_interaction_resampling_pool_after_warmup(survey):
+    df, schema = survey
+    args = (df, "WKL_c", ("EE", "DP", "PA"), schema.controls)
+    serial = interaction_resampling(*args, n_reps=500, n_jobs=1)
+    warm_in_background()
+    pooled = _within_timeout(interaction_resampling, *args, n_reps=500, n_jobs=3)
+    pd.testing.assert_frame_equal(serial, pooled)
+
+
+def test_bootstrap_reliability_pool_after_warmup(survey):
+    df, schema = survey
+    serial = bootstrap_reliability("serial", df, schema, n_boot=500, n_jobs=1)
+    warm_in_background()
+    pooled = _within_timeout(bootstrap_reliability, "pooled", df, schema, n_boot=500, n_jobs=3)
+    pd.testing.assert_frame_equal(serial, pooled)
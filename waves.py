@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+from pathlib import Path
+import re
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from moments import PairwiseMoments
+from schema import SCALE_LABELS, build_schema
+
+# Directory of processed survey waves; incremental mode is off when unset.
+WAVES_DIR_ENV = "IMP_DASHBOARD_WAVES_DIR"
+MANIFEST_NAME = "waves.json"
+WAVE_COLUMN = "Wave"
+POOLED = "All waves (pooled)"
+
+
+@dataclass(frozen=True)
+class WaveStatistics:
+    """Running statistics of one or more waves, mergeable without their rows.
+
+    ``columns`` holds pairwise-complete moments of every numeric column (means,
+    SDs, centring offsets and correlations); ``scales`` holds item moments over
+    the rows complete on each scale, the listwise covariance reliability uses.
+    """
+
+    columns: PairwiseMoments
+    scales: Dict[str, PairwiseMoments]
+
+    def merge(self, other: WaveStatistics) -> WaveStatistics:
+        scales = dict(self.scales)
+        for prefix, moments in other.scales.items():
+            scales[prefix] = scales[prefix].merge(moments) if prefix in scales else moments
+        return WaveStatistics(columns=self.columns.merge(other.columns), scales=scales)
+
+    def means(self) -> Dict[str, float]:
+        return dict(zip(self.columns.columns, self.columns.column_mean()))
+
+    def save(self, path: Path) -> None:
+        arrays = self.columns.to_arrays("columns.")
+        for prefix, moments in self.scales.items():
+            arrays.update(moments.to_arrays(f"scale.{prefix}."))
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp.npz")
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> WaveStatistics:
+        with np.load(path, allow_pickle=False) as arrays:
+            prefixes = {key.split(".")[1] for key in arrays.files if key.startswith("scale.")}
+            return cls(
+                columns=PairwiseMoments.from_arrays(arrays, "columns."),
+                scales={prefix: PairwiseMoments.from_arrays(arrays, f"scale.{prefix}.") for prefix in prefixes},
+            )
+
+
+def wave_statistics(df: pd.DataFrame) -> WaveStatistics:
+    """One pass over a processed wave."""
+    numeric = [
+        col for col in df.columns
+        if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])
+    ]
+    values = df[numeric].to_numpy(dtype="float64", na_value=np.nan)
+    scales: Dict[str, PairwiseMoments] = {}
+    for scale in build_schema(df).scales.values():
+        if len(scale.items) < 2:
+            continue
+        items = df[list(scale.items)].to_numpy(dtype="float64", na_value=np.nan)
+        scales[scale.prefix] = PairwiseMoments.from_values(scale.items, items[~np.isnan(items).any(axis=1)])
+    return WaveStatistics(columns=PairwiseMoments.from_values(numeric, values), scales=scales)
+
+
+def waves_dir() -> Optional[Path]:
+    value = os.environ.get(WAVES_DIR_ENV)
+    return Path(value) if value else None
+
+
+def read_manifest(directory: Path) -> list[dict]:
+    """Waves in the order they were added: name, source, fingerprint, rows and file stem."""
+    try:
+        return json.loads((directory / MANIFEST_NAME).read_text())["waves"]
+    except (OSError, ValueError, KeyError):
+        return []
+
+
+def manifest_version(directory: Path) -> str:
+    try:
+        content = (directory / MANIFEST_NAME).read_bytes()
+    except OSError:
+        content = b""
+    return hashlib.blake2b(content, digest_size=8).hexdigest()
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^0-9A-Za-z]+", "-", name).strip("-").lower() or "wave"
+
+
+def append_wave(directory: Path, name: str, df: pd.DataFrame, source: Path, fingerprint: str) -> dict:
+    """Persist a processed wave and its statistics, then list it in the manifest.
+
+    The work is proportional to the wave alone; earlier waves are not read.
+    Re-adding a source already in the store is a no-op.
+    """
+    waves = read_manifest(directory)
+    for wave in waves:
+        if wave["fingerprint"] == fingerprint:
+            return wave
+        if wave["name"] == name:
+            raise ValueError(f"A wave named {name!r} already exists in {directory}")
+
+    directory.mkdir(parents=True, exist_ok=True)
+    stem = f"wave-{len(waves) + 1:03d}-{_slug(name)}"
+    frame_tmp = directory / f"{stem}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(frame_tmp, index=False)
+        os.replace(frame_tmp, directory / f"{stem}.parquet")
+    finally:
+        frame_tmp.unlink(missing_ok=True)
+    wave_statistics(df).save(directory / f"{stem}.npz")
+
+    entry = {"name": name, "source": str(source), "fingerprint": fingerprint, "rows": len(df), "stem": stem}
+    manifest_tmp = directory / f"{MANIFEST_NAME}.{os.getpid()}.tmp"
+    manifest_tmp.write_text(json.dumps({"waves": [*waves, entry]}, indent=2))
+    os.replace(manifest_tmp, directory / MANIFEST_NAME)
+    return entry
+
+
+def view_names(directory: Path) -> list[str]:
+    return [POOLED, *(wave["name"] for wave in read_manifest(directory))]
+
+
+def wave_selector(directory: Path, current: str) -> str:
+    """Sidebar choice of one stored wave or all of them pooled."""
+    options = view_names(directory)
+    if len(options) <= 2:
+        # A single wave is the same rows as the pooled view.
+        return POOLED
+    index = options.index(current) if current in options else 0
+    return st.sidebar.selectbox("Survey wave", options, index=index)
+
+
+def _selected(directory: Path, view: str) -> list[dict]:
+    waves = read_manifest(directory)
+    return waves if view == POOLED else [wave for wave in waves if wave["name"] == view]
+
+
+def view_statistics(directory: Path, view: str) -> Optional[WaveStatistics]:
+    """Merged statistics of the waves in ``view``, from the stored per-wave files only."""
+    merged: Optional[WaveStatistics] = None
+    for wave in _selected(directory, view):
+        stats = WaveStatistics.load(directory / f"{wave['stem']}.npz")
+        merged = stats if merged is None else merged.merge(stats)
+    return merged
+
+
+def load_view(directory: Path, view: str) -> pd.DataFrame:
+    """Processed rows of the waves in ``view`` with a categorical ``Wave`` column (no centring)."""
+    selected = _selected(directory, view)
+    if not selected:
+        raise FileNotFoundError(f"No wave {view!r} in {directory}")
+    frames = [
+        pd.read_parquet(directory / f"{wave['stem']}.parquet").assign(**{WAVE_COLUMN: wave["name"]})
+        for wave in selected
+    ]
+    df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    # Categoricals with different categories per wave come back as objects.
+    for col in df.columns:
+        if all(isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames if col in frame.columns):
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype("category")
+    df[WAVE_COLUMN] = pd.Categorical(df[WAVE_COLUMN], categories=[wave["name"] for wave in selected])
+    return df
+
+
+def wave_summary(directory: Path) -> pd.DataFrame:
+    """Respondents and each scale's mean (SD) per wave and pooled, from the running statistics."""
+    rows = []
+    pooled: Optional[WaveStatistics] = None
+    waves = read_manifest(directory)
+    for wave in waves:
+        stats = WaveStatistics.load(directory / f"{wave['stem']}.npz")
+        pooled = stats if pooled is None else pooled.merge(stats)
+        rows.append(_summary_row(wave["name"], wave["rows"], stats))
+    if len(waves) > 1:
+        rows.append(_summary_row(POOLED, sum(wave["rows"] for wave in waves), pooled))
+    return pd.DataFrame(rows)
+
+
+def _summary_row(name: str, respondents: int, stats: WaveStatistics) -> dict:
+    row: Dict[str, object] = {WAVE_COLUMN: name, "Respondents": respondents}
+    means = stats.columns.column_mean()
+    sds = stats.columns.column_sd()
+    for idx, col in enumerate(stats.columns.columns):
+        if col in SCALE_LABELS:
+            row[col] = f"{means[idx]:.2f} ({sds[idx]:.2f})"
+    return row
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the incremental survey wave store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="process a wave file (.xlsx/.csv) and append it to the store")
+    add.add_argument("source", type=Path)
+    add.add_argument("--name", help="wave label shown in the dashboard (default: file name)")
+    commands.add_parser("list", help="show stored waves and their running statistics")
+    parser.add_argument("--dir", type=Path, default=waves_dir(), help=f"store directory (default: ${WAVES_DIR_ENV})")
+    args = parser.parse_args()
+    if args.dir is None:
+        parser.error(f"pass --dir or set {WAVES_DIR_ENV}")
+
+    if args.command == "add":
+        from data_loader import add_wave
+
+        entry = add_wave(args.source, args.name or args.source.stem, args.dir)
+        print(f"{entry['name']}: {entry['rows']:,} respondents ({entry['stem']})")
+    else:
+        print(wave_summary(args.dir).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()